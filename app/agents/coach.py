@@ -3,7 +3,7 @@ from typing import List
 from app.schemas.coach import CoachDecision
 from app.services.ollama_client import generate_json
 from app.core.config import GEN_MODEL
-from app.utils.url_check import is_valid_url
+from app.utils.url_check import scrub_task_links
 
 PROMPT = """You are a learning coach that adapts a study plan.
 
@@ -60,14 +60,7 @@ async def coach_decide(task_title: str,
         ),
         options={"temperature": 0.2, "num_ctx": 2048}
     )
-    # clean urls
+    # clean urls (checked concurrently, cached across decisions)
     actions = data.get("actions") or []
-    cleaned = []
-    for a in actions:
-        rr = a.get("resource_ref")
-        if rr:
-            if not await is_valid_url(rr):
-                a["resource_ref"] = None
-        cleaned.append(a)
-    data["actions"] = cleaned
+    data["actions"] = await scrub_task_links(actions)
     return CoachDecision(**data)
\ No newline at end of file
@@ -2,10 +2,11 @@
 from datetime import date, datetime
 import re
 from typing import Any, Optional
-from app.services.ollama_client import generate_json
-from app.schemas.plan import PlanResponse, PlanRequest
+from app.services.ollama_client import generate_json, stream_generate
+from app.schemas.plan import PlanResponse, PlanRequest, Task
 from app.core.config import GEN_MODEL
 from app.utils.url_check import scrub_task_links
+from app.utils.json_stream import ArrayItemParser
 
 def parse_deadline_to_days(deadline: str, today: date) -> int:
     """
@@ -72,6 +73,50 @@ Rules:
 def _iso(d: date) -> str:
     return d.strftime("%Y-%m-%d")
 
+def _prompt(req: PlanRequest, today: date, max_days: int) -> str:
+    return PROMPT.format(
+        goal=req.goal,
+        level=req.level,
+        minutes=req.minutes,
+        max_days=max_days,
+        today=_iso(today),
+    )
+
+def _normalize_task(t: dict, today: date, max_days: int) -> dict:
+    # Normalize task dates: accept either due_in_days (preferred) or due_date (legacy)
+    title = (t.get("title") or "Task").strip()
+    ttype = (t.get("type") or "lesson").strip()
+    est   = int(t.get("est_minutes", 30))
+    res   = t.get("resource_ref")
+
+    if "due_in_days" in t:
+        try:
+            offset = int(t["due_in_days"])
+        except Exception:
+            offset = 0
+        # clamp to [0, max_days]
+        offset = max(0, min(offset, max_days))
+        d = today.fromordinal(today.toordinal() + offset)
+    else:
+        # try legacy due_date; if in past or beyond window, clamp
+        dd = str(t.get("due_date", "")).strip()
+        try:
+            d = datetime.strptime(dd, "%Y-%m-%d").date()
+            if d < today:
+                d = today
+            if (d - today).days > max_days:
+                d = today.fromordinal(today.toordinal() + max_days)
+        except Exception:
+            d = today
+
+    return {
+        "title": title,
+        "type": ttype,
+        "est_minutes": est,
+        "due_date": _iso(d),       # keep external schema the same
+        "resource_ref": res,
+    }
+
 async def generate_plan(req: PlanRequest) -> PlanResponse:
     today = date.today()
     max_days = parse_deadline_to_days(req.deadline, today)
@@ -81,55 +126,10 @@ async def generate_plan(req: PlanRequest) -> PlanResponse:
 
     for attempt in range(2):
         try:
-            data: Any = await generate_json(
-                GEN_MODEL,
-                PROMPT.format(
-                    goal=req.goal,
-                    level=req.level,
-                    minutes=req.minutes,
-                    max_days=max_days,
-                    today=_iso(today),
-                ),
-                options=options,
-            )
-
-            # Normalize task dates: accept either due_in_days (preferred) or due_date (legacy)
+            data: Any = await generate_json(GEN_MODEL, _prompt(req, today, max_days), options=options)
+
             if isinstance(data, dict) and "tasks" in data:
-                normalized = []
-                for t in data.get("tasks", []):
-                    title = (t.get("title") or "Task").strip()
-                    ttype = (t.get("type") or "lesson").strip()
-                    est   = int(t.get("est_minutes", 30))
-                    res   = t.get("resource_ref")
-
-                    if "due_in_days" in t:
-                        try:
-                            offset = int(t["due_in_days"])
-                        except Exception:
-                            offset = 0
-                        # clamp to [0, max_days]
-                        offset = max(0, min(offset, max_days))
-                        d = today.fromordinal(today.toordinal() + offset)
-                    else:
-                        # try legacy due_date; if in past or beyond window, clamp
-                        dd = str(t.get("due_date", "")).strip()
-                        try:
-                            d = datetime.strptime(dd, "%Y-%m-%d").date()
-                            if d < today:
-                                d = today
-                            if (d - today).days > max_days:
-                                d = today.fromordinal(today.toordinal() + max_days)
-                        except Exception:
-                            d = today
-
-                    normalized.append({
-                        "title": title,
-                        "type": ttype,
-                        "est_minutes": est,
-                        "due_date": _iso(d),       # keep external schema the same
-                        "resource_ref": res,
-                    })
-                    
+                normalized = [_normalize_task(t, today, max_days) for t in data.get("tasks", [])]
                 normalized = await scrub_task_links(normalized)
                 data["tasks"] = normalized
 
@@ -144,4 +144,34 @@ async def generate_plan(req: PlanRequest) -> PlanResponse:
                 options = {"temperature": 0.1, "num_ctx": 2048}
                 continue
 
-    raise last_err if last_err else RuntimeError("Planner failed")
\ No newline at end of file
+    raise last_err if last_err else RuntimeError("Planner failed")
+
+async def stream_plan(req: PlanRequest):
+    """
+    Streaming variant of generate_plan: yields ("milestone", str) and ("task", Task)
+    as soon as each element is complete in the model output, then ("done", PlanResponse).
+    Tasks get the same date clamping and link scrubbing as generate_plan.
+    There is no retry: whatever was already emitted can't be taken back.
+    """
+    today = date.today()
+    max_days = parse_deadline_to_days(req.deadline, today)
+    parser = ArrayItemParser()
+    milestones: list[str] = []
+    tasks: list[Task] = []
+
+    async for frag in stream_generate(GEN_MODEL, _prompt(req, today, max_days),
+                                      options={"temperature": 0.2, "num_ctx": 2048}, json_format=True):
+        for key, item in parser.feed(frag):
+            if key == "milestones" and isinstance(item, str) and item.strip():
+                milestones.append(item)
+                yield "milestone", item
+            elif key == "tasks" and isinstance(item, dict) and len(tasks) < 12:
+                try:
+                    t = (await scrub_task_links([_normalize_task(item, today, max_days)]))[0]
+                    task = Task(**t)
+                except Exception:
+                    continue  # one malformed task shouldn't kill the stream
+                tasks.append(task)
+                yield "task", task
+
+    yield "done", PlanResponse(milestones=milestones, tasks=tasks)
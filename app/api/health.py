@@ -1,15 +1,87 @@
+import asyncio, time
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy import text
 from sqlmodel import Session
-from app.db.session import get_session
+from app.core.config import (
+    GEN_MODEL, EMBED_MODEL, READY_DB_TIMEOUT, READY_OLLAMA_TIMEOUT, READY_CACHE_TTL, READY_POOL_MAX_USAGE,
+)
+from app.db.session import get_session, engine, async_engine, pool_stats
 from app.db.models import Content
+from app.services.http_clients import ollama_http
 
 router = APIRouter(tags=["health"])
 
 @router.get("/health")
 def health():
+    # liveness only: the process is up
     return {"status": "ok"}
 
+# last readiness result (monotonic time, status code, body), shared by concurrent probes
+_ready: tuple[float, int, dict] | None = None
+_ready_lock = asyncio.Lock()
+
+def _model_name(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+async def _select_one() -> None:
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def _check_db() -> dict:
+    t0 = time.perf_counter()
+    try:
+        await asyncio.wait_for(_select_one(), READY_DB_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"no answer within {READY_DB_TIMEOUT}s"}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+async def _check_ollama() -> dict:
+    t0 = time.perf_counter()
+    try:
+        r = await ollama_http().get("/api/tags", timeout=READY_OLLAMA_TIMEOUT)
+        r.raise_for_status()
+        have = {_model_name(m.get("name", "")) for m in r.json().get("models", [])}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    missing = [m for m in (GEN_MODEL, EMBED_MODEL) if _model_name(m) not in have]
+    out = {"ok": not missing, "latency_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    if missing:
+        out["missing_models"] = missing
+    return out
+
+def _check_pools() -> dict:
+    pools = {"sync": pool_stats(engine), "async": pool_stats(async_engine.sync_engine)}
+    for p in pools.values():
+        p["usage"] = round(p["checked_out"] / max(1, p["size"] + p["max_overflow"]), 2)
+    return {"ok": all(p["usage"] < READY_POOL_MAX_USAGE for p in pools.values()), **pools}
+
+async def _readiness() -> tuple[int, dict]:
+    # pools first: the DB check itself borrows a connection
+    pools = _check_pools()
+    db, ollama = await asyncio.gather(_check_db(), _check_ollama())
+    checks = {"db": db, "pool": pools, "ollama": ollama}
+    ok = all(c["ok"] for c in checks.values())
+    return (200 if ok else 503), {"status": "ready" if ok else "unavailable", "checks": checks}
+
+@router.get("/health/ready")
+async def health_ready():
+    """
+    Readiness for the load balancer: 503 when Postgres is slow or down, either connection
+    pool is close to exhausted, or Ollama is unreachable or lacks GEN_MODEL / EMBED_MODEL.
+    Each check has a short timeout and the result is reused for READY_CACHE_TTL seconds,
+    so frequent probes from several balancers cost one round of checks.
+    """
+    global _ready
+    async with _ready_lock:
+        if _ready is None or time.monotonic() - _ready[0] >= READY_CACHE_TTL:
+            _ready = (time.monotonic(), *await _readiness())
+        _, status, body = _ready
+    return JSONResponse(body, status_code=status, headers={"Cache-Control": "no-store"})
+
 class SeedIn(BaseModel):
     title: str = "Hello"
     text: str = "Just a seed row"
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.core.config import COACH_JOB_POLL
+from app.db.session import async_session
+from app.db.models import CoachJob
+from app.schemas.jobs import CoachJobRead
+from app.services import coach_jobs
+from app.utils.sse import sse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+async def _load(job_id: int) -> CoachJob | None:
+    async with async_session() as s:
+        return await s.get(CoachJob, job_id)
+
+@router.get("/{job_id}", response_model=CoachJobRead)
+async def get_job(job_id: int):
+    job = await _load(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: int, request: Request):
+    """
+    Server-Sent Events: `status` whenever the job changes state, then `done`
+    with {actions, tips} or `failed` with the error.
+    """
+    job = await _load(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    async def events():
+        last = None
+        current = job
+        try:
+            while True:
+                if current.status != last:
+                    last = current.status
+                    yield sse("status", {"id": job_id, "status": current.status, "attempts": current.attempts})
+                if current.status == "done":
+                    yield sse("done", current.result or {})
+                    return
+                if current.status == "failed":
+                    yield sse("failed", {"detail": current.error})
+                    return
+                await coach_jobs.wait_for_change(job_id, COACH_JOB_POLL)
+                if await request.is_disconnected():
+                    return
+                current = await _load(job_id)
+                if current is None:
+                    yield sse("failed", {"detail": "Job not found"})
+                    return
+        finally:
+            coach_jobs.forget(job_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+from app.db.session import engine, async_engine, pool_stats
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    for name, e in (("sync", engine), ("async", async_engine.sync_engine)):
+        for state, v in pool_stats(e).items():
+            metrics.DB_POOL_CONNECTIONS.set(v, engine=name, state=state)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
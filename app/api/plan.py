@@ -1,13 +1,57 @@
-from fastapi import APIRouter, HTTPException
-from app.agents.planner import generate_plan
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from app.agents.planner import stream_plan
+from app.services import plan_cache
 from app.schemas.plan import PlanRequest, PlanResponse
+from app.utils.sse import sse
 
 router = APIRouter(prefix="/plan", tags=["plan"])
 
 @router.post("/generate", response_model=PlanResponse)
-async def generate(body: PlanRequest):
+async def generate(body: PlanRequest, request: Request, response: Response):
+    """
+    Identical requests (same goal/level/minutes/deadline, same day) share one
+    generation while it runs and reuse its result for PLAN_CACHE_TTL seconds.
+    `X-Plan-Cache: hit | coalesced | miss` says which happened;
+    `Cache-Control: no-cache` skips the cache (a run already in flight is still shared).
+    """
+    no_cache = "no-cache" in (request.headers.get("cache-control") or "").lower()
     try:
-        return await generate_plan(body)
+        plan, status, age = await plan_cache.get_plan(body, use_cache=not no_cache)
     except Exception as e:
         # keep errors clean for the client
-        raise HTTPException(status_code=500, detail=f"Planner failed: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Planner failed: {e}")
+    response.headers["X-Plan-Cache"] = status
+    if age is not None:
+        response.headers["Age"] = str(int(age))
+    return plan
+
+@router.get("/cache/stats")
+def cache_stats():
+    return plan_cache.cache_stats()
+
+@router.post("/generate/stream")
+async def generate_stream(body: PlanRequest):
+    """
+    Server-Sent Events: `milestone` ({index, text}) and `task` ({index, ...Task})
+    as soon as each is ready, then `done` with the full plan, or `error`.
+    """
+    async def events():
+        counts = {"milestone": 0, "task": 0}
+        try:
+            async for kind, item in stream_plan(body):
+                if kind == "done":
+                    yield sse("done", item.model_dump())
+                    continue
+                counts[kind] += 1
+                payload = {"index": counts[kind], "text": item} if kind == "milestone" \
+                    else {"index": counts[kind], **item.model_dump()}
+                yield sse(kind, payload)
+        except Exception as e:
+            yield sse("error", {"detail": f"Planner failed: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import insert, func, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlmodel import Session, select
 from app.db.session import get_session
 from app.db.models import Plan, PlanMilestone, PlanTask
-from app.schemas.plan_persist import PlanCreate, PlanRead, PlanSummary, PlanMilestoneOut, PlanTaskOut
+from app.db import progress
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.etag import plan_etag, etag_matches, set_etag, not_modified
+from app.schemas.plan_persist import (
+    PlanCreate, PlanRead, PlanSummary, PlanPage, PlanMilestoneOut, PlanTaskOut, PlanBatchCreate, PlanBatchResult,
+)
 
 router = APIRouter(prefix="/plans", tags=["plans"])
 
+def _milestone_rows(plan_id: int, body: PlanCreate) -> list[dict]:
+    return [dict(plan_id=plan_id, order_index=idx, text=text) for idx, text in enumerate(body.milestones, start=1)]
+
+def _task_rows(plan_id: int, body: PlanCreate) -> list[dict]:
+    return [
+        dict(plan_id=plan_id, order_index=idx, title=t.title, type=t.type, est_minutes=t.est_minutes,
+             due_date=t.due_date, resource_ref=t.resource_ref)
+        for idx, t in enumerate(body.tasks, start=1)
+    ]
+
+_MILESTONE_COLS = (PlanMilestone.id, PlanMilestone.order_index, PlanMilestone.text)
+_TASK_COLS = (PlanTask.id, PlanTask.order_index, PlanTask.title, PlanTask.type,
+              PlanTask.est_minutes, PlanTask.due_date, PlanTask.resource_ref)
+
+def _json_children(model, cols, order_col):
+    # correlated (plan_id = plan.id) json array of child rows, ordered, '[]' when none
+    obj = func.json_build_object(*[x for c in cols for x in (c.key, c)])
+    return (
+        select(func.coalesce(func.json_agg(aggregate_order_by(obj, order_col)), literal_column("'[]'::json")))
+        .where(model.plan_id == Plan.id)
+        .scalar_subquery()
+    )
+
+def _load_plan(s: Session, plan_id: int) -> PlanRead | None:
+    """Plan + milestones + tasks in a single round trip."""
+    row = s.exec(
+        select(
+            Plan.id, Plan.name, Plan.goal, Plan.level, Plan.minutes, Plan.deadline,
+            _json_children(PlanMilestone, _MILESTONE_COLS, PlanMilestone.order_index).label("milestones"),
+            _json_children(PlanTask, _TASK_COLS, PlanTask.order_index).label("tasks"),
+        ).where(Plan.id == plan_id)
+    ).first()
+    return PlanRead(**row._mapping) if row else None
+
 @router.post("", response_model=PlanRead)
 def create_plan(body: PlanCreate, s: Session = Depends(get_session)):
     plan = Plan(
@@ -14,59 +57,93 @@ def create_plan(body: PlanCreate, s: Session = Depends(get_session)):
     )
     s.add(plan)
     s.flush()  # get plan.id
+    plan_id = plan.id
 
-    # milestones
-    for idx, text in enumerate(body.milestones, start=1):
-        s.add(PlanMilestone(plan_id=plan.id, order_index=idx, text=text))
-
-    # tasks
-    for idx, t in enumerate(body.tasks, start=1):
-        s.add(PlanTask(
-            plan_id=plan.id, order_index=idx,
-            title=t.title, type=t.type, est_minutes=t.est_minutes,
-            due_date=t.due_date, resource_ref=t.resource_ref
-        ))
+    # children: one multi-row INSERT ... RETURNING each, which also hydrates the response
+    milestones = s.exec(
+        insert(PlanMilestone).returning(*_MILESTONE_COLS, sort_by_parameter_order=True),
+        params=_milestone_rows(plan_id, body),
+    ).all() if body.milestones else []
+    tasks = s.exec(
+        insert(PlanTask).returning(*_TASK_COLS, sort_by_parameter_order=True),
+        params=_task_rows(plan_id, body),
+    ).all() if body.tasks else []
+    s.exec(progress.tasks_added({plan_id: len(tasks)}))
 
     s.commit()
 
-    # return hydrated
-    s.refresh(plan)
-    milestones = s.exec(select(PlanMilestone).where(PlanMilestone.plan_id == plan.id).order_by(PlanMilestone.order_index)).all()
-    tasks = s.exec(select(PlanTask).where(PlanTask.plan_id == plan.id).order_by(PlanTask.order_index)).all()
     return PlanRead(
-        id=plan.id, name=plan.name, goal=plan.goal, level=plan.level,
-        minutes=plan.minutes, deadline=plan.deadline,
-        milestones=[PlanMilestoneOut(id=m.id, order_index=m.order_index, text=m.text) for m in milestones],
-        tasks=[PlanTaskOut(id=t.id, order_index=t.order_index, title=t.title, type=t.type,
-                           est_minutes=t.est_minutes, due_date=t.due_date, resource_ref=t.resource_ref) for t in tasks]
+        id=plan_id, name=body.name, goal=body.goal, level=body.level,
+        minutes=body.minutes, deadline=body.deadline,
+        milestones=[PlanMilestoneOut(**m._mapping) for m in milestones],
+        tasks=[PlanTaskOut(**t._mapping) for t in tasks],
     )
 
-@router.get("", response_model=list[PlanSummary])
-def list_plans(s: Session = Depends(get_session)):
-    rows = s.exec(select(Plan).order_by(Plan.created_at.desc())).all()
-    return [PlanSummary(id=p.id, name=p.name) for p in rows]
+@router.post("/batch", response_model=PlanBatchResult)
+def create_plans_batch(body: PlanBatchCreate, s: Session = Depends(get_session)):
+    """Create many plans in one transaction (cohort imports); returns ids in input order."""
+    now = datetime.utcnow()
+    ids = s.exec(
+        insert(Plan).returning(Plan.id, sort_by_parameter_order=True),
+        params=[dict(name=p.name, goal=p.goal, level=p.level, minutes=p.minutes,
+                     deadline=p.deadline, created_at=now) for p in body.plans],
+    ).scalars().all()
+
+    milestone_rows = [r for pid, p in zip(ids, body.plans) for r in _milestone_rows(pid, p)]
+    task_rows = [r for pid, p in zip(ids, body.plans) for r in _task_rows(pid, p)]
+    if milestone_rows:
+        s.exec(insert(PlanMilestone), params=milestone_rows)
+    if task_rows:
+        s.exec(insert(PlanTask), params=task_rows)
+    s.exec(progress.tasks_added({pid: len(p.tasks) for pid, p in zip(ids, body.plans)}))
+
+    s.commit()
+    return PlanBatchResult(ids=list(ids))
+
+@router.get("", response_model=PlanPage)
+def list_plans(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    s: Session = Depends(get_session),
+):
+    """Newest first, keyset-paginated on (created_at, id)."""
+    q = select(Plan.id, Plan.name, Plan.created_at).order_by(Plan.created_at.desc(), Plan.id.desc())
+    if cursor:
+        try:
+            created, last_id = decode_cursor(cursor, 2)
+            q = q.where(tuple_(Plan.created_at, Plan.id) < (datetime.fromisoformat(created), int(last_id)))
+        except (ValueError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+
+    rows = s.exec(q.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at.isoformat(), rows[-1].id)
+    return PlanPage(items=[PlanSummary(id=p.id, name=p.name) for p in rows], next_cursor=next_cursor)
 
 @router.get("/{plan_id}", response_model=PlanRead)
-def get_plan(plan_id: int, s: Session = Depends(get_session)):
-    plan = s.get(Plan, plan_id)
+def get_plan(plan_id: int, request: Request, response: Response, s: Session = Depends(get_session)):
+    # version is read before the plan, so a concurrent write can only make the ETag too old (a refetch)
+    version = s.exec(progress.version_of(plan_id)).first()
+    etag = plan_etag("plan", plan_id, version) if version is not None else None
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+
+    plan = _load_plan(s, plan_id)
     if not plan:
         raise HTTPException(404, "Plan not found")
-    milestones = s.exec(select(PlanMilestone).where(PlanMilestone.plan_id == plan_id).order_by(PlanMilestone.order_index)).all()
-    tasks = s.exec(select(PlanTask).where(PlanTask.plan_id == plan_id).order_by(PlanTask.order_index)).all()
-    return PlanRead(
-        id=plan.id, name=plan.name, goal=plan.goal, level=plan.level,
-        minutes=plan.minutes, deadline=plan.deadline,
-        milestones=[PlanMilestoneOut(id=m.id, order_index=m.order_index, text=m.text) for m in milestones],
-        tasks=[PlanTaskOut(id=t.id, order_index=t.order_index, title=t.title, type=t.type,
-                           est_minutes=t.est_minutes, due_date=t.due_date, resource_ref=t.resource_ref) for t in tasks]
-    )
+    if etag:
+        set_etag(response, etag)
+    return plan
 
 @router.delete("/{plan_id}", status_code=204)
 def delete_plan(plan_id: int, s: Session = Depends(get_session)):
     plan = s.get(Plan, plan_id)
     if not plan:
         raise HTTPException(404, "Plan not found")
-    # ORM-level cascade (we set cascade="all, delete-orphan" on relationships)
+    # ORM-level cascade (we set cascade="all, delete-orphan" on relationships); planprogress,
+    # and with it the version behind this plan's ETags, goes via ON DELETE CASCADE
     s.delete(plan)
     s.commit()
-    return Response(status_code=204)
\ No newline at end of file
+    return Response(status_code=204)
@@ -1,59 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
-from sqlalchemy import func
-from datetime import date, timedelta
+from sqlalchemy import case
+from datetime import date
 from app.db.session import get_session
-from app.db.models import Plan, PlanTask, TaskProgress
+from app.db.models import PlanProgress
+from app.utils.etag import plan_etag, etag_matches, set_etag, not_modified
 
 router = APIRouter(tags=["progress"])
 
-@router.get("/plans/{plan_id}/progress")
-def plan_progress(plan_id: int, s: Session = Depends(get_session)):
-    plan = s.get(Plan, plan_id)
-    if not plan:
-        raise HTTPException(404, "Plan not found")
+MAX_IDS = 500
 
-    # total tasks for this plan
-    total = s.exec(
-        select(func.count())
-        .select_from(PlanTask)
-        .where(PlanTask.plan_id == plan_id)
-    ).one() or 0
+def _progress_query(today: date):
+    # the stored streak ends at last_done_date; it only counts if that is today
+    streak = case((PlanProgress.last_done_date == today, PlanProgress.streak_days), else_=0)
+    return select(
+        PlanProgress.plan_id, PlanProgress.total, PlanProgress.done,
+        streak.label("streak_days"), PlanProgress.last_done_date, PlanProgress.version,
+    )
 
-    # number of DISTINCT tasks with at least one 'done'
-    done = s.exec(
-        select(func.count(func.distinct(TaskProgress.task_id)))
-        .join(PlanTask, PlanTask.id == TaskProgress.task_id)
-        .where(PlanTask.plan_id == plan_id, TaskProgress.outcome == "done")
-    ).one() or 0
+def _row(r) -> dict:
+    return {
+        "plan_id": r.plan_id,
+        "total": int(r.total),
+        "done": int(r.done),
+        "streak_days": int(r.streak_days),
+        "last_done_date": r.last_done_date,
+    }
 
-    # dates with at least one 'done' (returns scalars, not tuples)
-    done_dates = s.exec(
-        select(
-            func.date(
-                func.coalesce(TaskProgress.finished_at, TaskProgress.started_at)
-            )
-        )
-        .join(PlanTask, PlanTask.id == TaskProgress.task_id)
-        .where(PlanTask.plan_id == plan_id, TaskProgress.outcome == "done")
-        .group_by(
-            func.date(
-                func.coalesce(TaskProgress.finished_at, TaskProgress.started_at)
-            )
-        )
-    ).all()
-    date_set = {d for d in done_dates if d is not None}
+@router.get("/plans/progress")
+def plans_progress(ids: str = Query(..., description="comma-separated plan ids"),
+                   s: Session = Depends(get_session)):
+    """Progress for many plans in one query; unknown ids are left out."""
+    try:
+        plan_ids = list(dict.fromkeys(int(x) for x in ids.split(",") if x.strip()))
+    except ValueError:
+        raise HTTPException(422, "ids must be comma-separated integers")
+    if len(plan_ids) > MAX_IDS:
+        raise HTTPException(422, f"at most {MAX_IDS} ids per request")
+    if not plan_ids:
+        return []
 
-    # streak ending today
-    streak = 0
-    cur = date.today()
-    while cur in date_set:
-        streak += 1
-        cur = cur - timedelta(days=1)
+    rows = s.exec(_progress_query(date.today()).where(PlanProgress.plan_id.in_(plan_ids))).all()
+    by_id = {r.plan_id: _row(r) for r in rows}
+    return [by_id[i] for i in plan_ids if i in by_id]
 
-    return {
-        "plan_id": plan_id,
-        "total": int(total),
-        "done": int(done),
-        "streak_days": streak
-    }
\ No newline at end of file
+@router.get("/plans/{plan_id}/progress")
+def plan_progress(plan_id: int, request: Request, response: Response, s: Session = Depends(get_session)):
+    # every plan gets a summary row on creation (and via the backfill migration)
+    today = date.today()
+    row = s.exec(_progress_query(today).where(PlanProgress.plan_id == plan_id)).first()
+    if not row:
+        raise HTTPException(404, "Plan not found")
+    # the streak depends on the date as well as the row
+    etag = plan_etag("progress", plan_id, row.version, today)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return _row(row)
@@ -1,58 +1,271 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import text as sqltext
-from sqlmodel import Session, select
-from app.db.session import get_session
+import codecs, uuid
+from collections import OrderedDict, deque
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from sqlalchemy import text as sqltext, delete
+from sqlmodel import select
+from app.core.config import INGEST_STREAM_BATCH, CHUNK_STRATEGY, CHUNK_MAX_TOKENS
+from app.db.session import async_session, apply_search_params, iterative_scan_enabled
+from app.db.bulk import copy_chunks, chunk_hash
 from app.db.models import Document, Chunk
-from app.schemas.rag import IngestRequest, IngestResponse, SearchRequest, SearchResponse, SearchHit
-from app.services.chunking import split_into_chunks
-from app.services.embeddings import embed_text
+from app.schemas.rag import (
+    IngestRequest, IngestResponse, SearchRequest, SearchResponse, SearchHit,
+    StreamIngestResponse, IngestProgress, ChunkStrategy, UpdateContentRequest, UpdateContentResponse,
+    BatchSearchRequest, BatchSearchResponse, BatchSearchResult,
+)
+from app.services.chunking import split_into_chunks, iter_chunks_async
+from app.services.embeddings import embed_text, embed_texts
+from app.services import embed_cache, local_index
+from app.services.retrieval import (
+    vector_search, batch_vector_search, lexical_search, hybrid_search, filter_clauses, chunks_by_id,
+)
+from app.utils.tags import normalize_tags
 
 router = APIRouter(tags=["rag"])
 
 @router.post("/content/ingest", response_model=IngestResponse)
-async def ingest(body: IngestRequest, s: Session = Depends(get_session)):
+async def ingest(body: IngestRequest):
     if not body.text.strip():
         raise HTTPException(400, "Empty text")
 
-    doc = Document(title=body.title.strip(), tags=body.tags)
-    s.add(doc)
-    s.flush()
-
-    parts = [p for p in split_into_chunks(body.text) if p.strip()]
+    chunking, max_tokens = body.chunking or CHUNK_STRATEGY, body.max_tokens or CHUNK_MAX_TOKENS
+    parts = [p for p in split_into_chunks(body.text, chunking, max_tokens) if p.strip()]
     if not parts:
         raise HTTPException(400, "No non-empty chunks after splitting")
 
-    for i, chunk_text in enumerate(parts, start=1):
-        emb = await embed_text(chunk_text)  # will raise if empty/mismatched
-        s.add(Chunk(document_id=doc.id, order_index=i, text=chunk_text, embedding=emb, meta=None))
+    # embed everything before touching the DB so no transaction is open while Ollama works
+    vecs = await embed_texts(parts)  # will raise if empty/mismatched
 
-    s.commit()
+    async with async_session() as s:
+        doc = Document(title=body.title.strip(), tags=body.tags, tag_list=normalize_tags(body.tags),
+                       chunking=chunking, chunk_max_tokens=max_tokens)
+        s.add(doc)
+        await s.flush()
+        await copy_chunks(s, doc.id, [(i, t, emb) for i, (t, emb) in enumerate(zip(parts, vecs), start=1)])
+        await s.commit()
+    await local_index.sync_document(doc.id, {chunk_hash(t): v for t, v in zip(parts, vecs)})
     return IngestResponse(document_id=doc.id, chunks=len(parts))
 
+async def _chunk_hashes(s, document_id: int) -> list[tuple[int, int, str]]:
+    rows = (await s.exec(
+        select(Chunk.id, Chunk.order_index, Chunk.content_hash)
+        .where(Chunk.document_id == document_id).order_by(Chunk.order_index, Chunk.id)
+    )).all()
+    return [tuple(r) for r in rows]
+
+def _match_chunks(parts: list[str], existing: list[tuple[int, int, str]]):
+    """
+    Pair new chunk texts with existing rows of identical text, in order (repeated
+    chunks pair up first come, first served). Returns (kept [(id, new_order, old_order)],
+    new [(order, text)], removed ids).
+    """
+    pool: dict[str, deque] = {}
+    for cid, order, h in existing:
+        pool.setdefault(h, deque()).append((cid, order))
+    kept, new = [], []
+    for i, t in enumerate(parts, start=1):
+        q = pool.get(chunk_hash(t))
+        if q:
+            cid, old = q.popleft()
+            kept.append((cid, i, old))
+        else:
+            new.append((i, t))
+    removed = [cid for q in pool.values() for cid, _ in q]
+    return kept, new, removed
+
+# locked diff passes for PUT /content/{id} before giving up on a document that keeps changing
+_UPDATE_ATTEMPTS = 3
+
+@router.put("/content/{document_id}", response_model=UpdateContentResponse)
+async def update_content(document_id: int, body: UpdateContentRequest):
+    """
+    Replace a document's text, re-embedding only what changed. The new text is chunked
+    and matched to the existing chunks by content hash: matches keep their row and
+    embedding (order_index is updated in place), the rest are embedded and inserted,
+    and chunks that no longer occur are deleted. Chunking defaults to whatever the
+    document was ingested with, so unchanged text keeps its chunk boundaries.
+    """
+    if not body.text.strip():
+        raise HTTPException(400, "Empty text")
+
+    async with async_session() as s:
+        doc = await s.get(Document, document_id)
+        if not doc:
+            raise HTTPException(404, "Document not found")
+        chunking = body.chunking or doc.chunking or CHUNK_STRATEGY
+        max_tokens = body.max_tokens or doc.chunk_max_tokens or CHUNK_MAX_TOKENS
+        parts = [p for p in split_into_chunks(body.text, chunking, max_tokens) if p.strip()]
+        if not parts:
+            raise HTTPException(400, "No non-empty chunks after splitting")
+        _, new, _ = _match_chunks(parts, await _chunk_hashes(s, document_id))
+
+    vecs: dict[str, list[float]] = {}
+    for _ in range(_UPDATE_ATTEMPTS):
+        # embed outside the transaction, as ingest does
+        texts = [t for t in dict.fromkeys(t for _, t in new) if t not in vecs]
+        if texts:
+            vecs.update(zip(texts, await embed_texts(texts)))
+
+        async with async_session() as s:
+            doc = (await s.exec(select(Document).where(Document.id == document_id).with_for_update())).first()
+            if not doc:
+                raise HTTPException(404, "Document not found")
+            # diff again under the row lock; a concurrent update may have changed the chunks meanwhile
+            kept, new, removed = _match_chunks(parts, await _chunk_hashes(s, document_id))
+            if any(t not in vecs for _, t in new):
+                continue   # never wait on Ollama holding the lock: release it, embed the rest, retry
+
+            if removed:
+                await s.exec(delete(Chunk).where(Chunk.id.in_(removed)))
+            moved = [(cid, order) for cid, order, old in kept if order != old]
+            if moved:
+                await s.exec(sqltext("""
+                    UPDATE chunk SET order_index = m.order_index
+                    FROM unnest(CAST(:ids AS int[]), CAST(:orders AS int[])) AS m(id, order_index)
+                    WHERE chunk.id = m.id
+                """).bindparams(ids=[c for c, _ in moved], orders=[o for _, o in moved]))
+            if new:
+                await copy_chunks(s, document_id, [(order, t, vecs[t]) for order, t in new])
+            if body.title is not None and body.title.strip():
+                doc.title = body.title.strip()
+            if body.tags is not None:
+                doc.tags, doc.tag_list = body.tags, normalize_tags(body.tags)
+            doc.chunking, doc.chunk_max_tokens = chunking, max_tokens
+            s.add(doc)
+            await s.commit()
+            break
+    else:
+        raise HTTPException(409, "Document is being updated concurrently; try again")
+
+    inserted = {t: vecs[t] for _, t in new}
+    await local_index.sync_document(document_id, {chunk_hash(t): v for t, v in inserted.items()})
+
+    return UpdateContentResponse(document_id=document_id, chunks=len(parts), kept=len(kept), moved=len(moved),
+                                 added=len(new), removed=len(removed), embedded=len(inserted))
+
+# in-process progress of recent streaming ingests, oldest evicted first
+_ingest_progress: "OrderedDict[str, IngestProgress]" = OrderedDict()
+_MAX_TRACKED_INGESTS = 1000
+
+def _track(p: IngestProgress) -> IngestProgress:
+    _ingest_progress[p.ingest_id] = p
+    while len(_ingest_progress) > _MAX_TRACKED_INGESTS:
+        _ingest_progress.popitem(last=False)
+    return p
+
+async def _drop_document(document_id: int) -> None:
+    async with async_session() as s:
+        await s.exec(delete(Chunk).where(Chunk.document_id == document_id))
+        await s.exec(delete(Document).where(Document.id == document_id))
+        await s.commit()
+    await local_index.drop_document(document_id)
+
+@router.post("/content/ingest/stream", response_model=StreamIngestResponse)
+async def ingest_stream(request: Request, title: str, tags: Optional[str] = None, ingest_id: Optional[str] = None,
+                        chunking: Optional[ChunkStrategy] = None,
+                        max_tokens: Optional[int] = Query(None, ge=32, le=2048)):
+    """
+    Ingest a large document sent as the raw request body (UTF-8 text).
+    The body is chunked as it arrives; every INGEST_STREAM_BATCH chunks are embedded
+    and COPY'd into `chunk` in their own short transaction, so memory stays flat.
+    Poll GET /content/ingest/{ingest_id}/progress while it runs (pass your own ingest_id to know it up front).
+    """
+    prog = _track(IngestProgress(ingest_id=ingest_id or uuid.uuid4().hex, status="running"))
+    chunking, max_tokens = chunking or CHUNK_STRATEGY, max_tokens or CHUNK_MAX_TOKENS
+
+    async with async_session() as s:
+        doc = Document(title=title.strip(), tags=tags, tag_list=normalize_tags(tags),
+                       chunking=chunking, chunk_max_tokens=max_tokens)
+        s.add(doc)
+        await s.commit()
+    prog.document_id = doc.id
+
+    async def text_pieces():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for raw in request.stream():
+            prog.bytes += len(raw)
+            yield decoder.decode(raw)
+        yield decoder.decode(b"", final=True)
+
+    async def flush(batch: list[str]) -> None:
+        vecs = await embed_texts(batch)
+        start = prog.chunks + 1
+        async with async_session() as s:
+            await copy_chunks(s, doc.id, [(start + i, t, emb) for i, (t, emb) in enumerate(zip(batch, vecs))])
+            await s.commit()
+        await local_index.sync_document(doc.id, {chunk_hash(t): v for t, v in zip(batch, vecs)})
+        prog.chunks += len(batch)
+
+    batch: list[str] = []
+    try:
+        async for chunk_text in iter_chunks_async(text_pieces(), chunking, max_tokens):
+            batch.append(chunk_text)
+            if len(batch) >= INGEST_STREAM_BATCH:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+        if not prog.chunks:
+            raise HTTPException(400, "No non-empty chunks after splitting")
+    except Exception as e:
+        prog.status, prog.error = "failed", str(getattr(e, "detail", e))
+        await _drop_document(doc.id)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(502, f"Ingest failed: {e}")
+
+    prog.status = "done"
+    return StreamIngestResponse(document_id=doc.id, chunks=prog.chunks, ingest_id=prog.ingest_id, bytes=prog.bytes)
+
+@router.get("/content/ingest/{ingest_id}/progress", response_model=IngestProgress)
+def ingest_progress(ingest_id: str):
+    prog = _ingest_progress.get(ingest_id)
+    if not prog:
+        raise HTTPException(404, "Unknown ingest_id")
+    return prog
+
+def _use_local_index(body) -> bool:
+    # the local index handles document_ids itself; tag/date filters need Postgres
+    return local_index.enabled() and not (body.tags or body.created_after or body.created_before)
+
+async def _local_hits(nears: list[list[tuple[int, float]]]) -> list[list[SearchHit]]:
+    # VECTOR_BACKEND=local: ranked in process, then one primary-key lookup for all hit rows
+    ids = {cid for near in nears for cid, _ in near}
+    rows = {}
+    if ids:
+        async with async_session() as s:
+            rows = {r[0]: r for r in (await s.exec(chunks_by_id(ids))).all()}
+    return [
+        [SearchHit(id=cid, document_id=rows[cid][1], chunk=rows[cid][2], title=rows[cid][3], score=d)
+         for cid, d in near if cid in rows]  # skips chunks deleted since the last index sync
+        for near in nears
+    ]
+
 @router.post("/rag/search", response_model=SearchResponse)
-async def rag_search(body: SearchRequest, s: Session = Depends(get_session)):
+async def rag_search(body: SearchRequest):
     q = (body.query or "").strip()
     if not q:
         return SearchResponse(hits=[])
 
-    qvec = await embed_text(q)  # validated vector (length == EMBED_DIM)
+    if body.mode == "vector" and _use_local_index(body):
+        near = await local_index.search(await embed_text(q), body.top_k, body.document_ids or None)
+        return SearchResponse(hits=(await _local_hits([near]))[0])
 
-    dist = Chunk.embedding.cosine_distance(qvec)
+    where = filter_clauses(body.tags, body.document_ids, body.created_after, body.created_before)
+    prefilter = bool(where) and not iterative_scan_enabled()
 
-    stmt = (
-        select(
-            Chunk.id,
-            Chunk.document_id,
-            Chunk.text,
-            Document.title,
-            dist.label("score"),
-        )
-        .join(Document, Document.id == Chunk.document_id)
-        .order_by(dist)
-        .limit(body.top_k)
-    )
+    if body.mode == "lexical":
+        stmt = lexical_search(q, body.top_k, where)
+    else:
+        qvec = await embed_text(q)  # validated vector (length == EMBED_DIM)
+        stmt = vector_search(qvec, body.top_k, where, prefilter) if body.mode == "vector" \
+            else hybrid_search(q, qvec, body.top_k, where, prefilter)
 
-    rows = s.exec(stmt).all()
+    async with async_session() as s:
+        if body.mode != "lexical":
+            await apply_search_params(s, body.top_k, ef_search=body.ef_search, probes=body.probes,
+                                      filtered=bool(where))
+        rows = (await s.exec(stmt)).all()
 
     hits = [
         SearchHit(
@@ -64,4 +277,45 @@ async def rag_search(body: SearchRequest, s: Session = Depends(get_session)):
         )
         for row in rows
     ]
-    return SearchResponse(hits=hits)
\ No newline at end of file
+    return SearchResponse(hits=hits)
+
+@router.post("/rag/search/batch", response_model=BatchSearchResponse)
+async def rag_search_batch(body: BatchSearchRequest):
+    """
+    Vector search for many queries at once: one embed_texts call for all of them and
+    one SQL statement (a LATERAL top-k per query vector). Blank queries get no hits.
+    """
+    queries = [bq.query.strip() for bq in body.queries]
+    todo = [i for i, q in enumerate(queries) if q]
+    hits: list[list[SearchHit]] = [[] for _ in queries]
+    if not todo:
+        return BatchSearchResponse(results=[BatchSearchResult(query=bq.query, hits=[]) for bq in body.queries])
+
+    vecs = await embed_texts([queries[i] for i in todo])
+    ks = [body.queries[i].top_k for i in todo]
+
+    if _use_local_index(body):
+        nears = [await local_index.search(v, k, body.document_ids or None) for v, k in zip(vecs, ks)]
+        for i, h in zip(todo, await _local_hits(nears)):
+            hits[i] = h
+    else:
+        where = filter_clauses(body.tags, body.document_ids, body.created_after, body.created_before)
+        prefilter = bool(where) and not iterative_scan_enabled()
+        async with async_session() as s:
+            await apply_search_params(s, max(ks), ef_search=body.ef_search, probes=body.probes,
+                                      filtered=bool(where))
+            rows = (await s.exec(batch_vector_search(vecs, ks, where, prefilter))).all()
+        # rows are ordered by (query, distance)
+        for qi, cid, document_id, chunk, title, score in rows:
+            hits[todo[qi]].append(SearchHit(id=cid, document_id=document_id, chunk=chunk, title=title,
+                                            score=float(score)))
+
+    return BatchSearchResponse(results=[BatchSearchResult(query=bq.query, hits=h) for bq, h in zip(body.queries, hits)])
+
+@router.get("/rag/cache/stats")
+def embedding_cache_stats():
+    return embed_cache.stats()
+
+@router.get("/rag/index/stats")
+def local_index_stats():
+    return local_index.stats()
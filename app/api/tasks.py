@@ -1,51 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
-from sqlalchemy import select as sqla_select
-from datetime import date, timedelta, datetime
-from typing import List
-from app.db.session import get_session
-from app.db.models import Plan, PlanTask, TaskProgress
+from sqlalchemy import false, tuple_
+from datetime import date, datetime
+from typing import Optional
+from app.db.session import get_session, async_session
+from app.db.models import Plan, PlanTask, TaskProgress, CoachJob
+from app.db import progress
 from app.schemas.session import CompleteTaskRequest
 from app.schemas.today import TodayResponse, TodayTask
-from app.agents.coach import coach_decide
+from app.services import coach_jobs
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.etag import plan_etag, etag_matches, set_etag, not_modified
 
 router = APIRouter(tags=["tasks"])
 
 @router.get("/plans/{plan_id}/today", response_model=TodayResponse)
 def tasks_today(
     plan_id: int,
+    request: Request,
+    response: Response,
     scope: str = Query("today", pattern="^(today|upcoming|all)$"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     s: Session = Depends(get_session),
 ):
-    plan = s.get(Plan, plan_id)
-    if not plan:
-        raise HTTPException(404, "Plan not found")
-
     today = date.today()
-    q = select(PlanTask).where(PlanTask.plan_id == plan_id)
+    # the plan's version doubles as the existence check; same day + same page + same version = same body
+    version = s.exec(progress.version_of(plan_id)).first()
+    if version is None:
+        if s.exec(select(Plan.id).where(Plan.id == plan_id)).first() is None:
+            raise HTTPException(404, "Plan not found")
+        etag = None
+    else:
+        etag = plan_etag("today", plan_id, version, today, scope, limit, cursor or "")
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    # only the columns TodayTask needs
+    q = select(
+        PlanTask.id, PlanTask.title, PlanTask.type, PlanTask.est_minutes, PlanTask.due_date, PlanTask.resource_ref,
+    ).where(PlanTask.plan_id == plan_id)
 
     # Exclude tasks already completed (done). If you’d like to also exclude partial/skip, add them here.
-    done_subq = sqla_select(TaskProgress.task_id).where(TaskProgress.outcome == "done")
-    q = q.where(~PlanTask.id.in_(done_subq))
-
+    # plantask.done mirrors "has a done progress row"; idx_plantask_open_due covers these scans
+    q = q.where(PlanTask.done == false())
+    q = q.order_by(PlanTask.due_date, PlanTask.id)
+
+    # keyset pagination on (due_date, id)
+    page = q
+    if cursor:
+        try:
+            due, last_id = decode_cursor(cursor, 2)
+            page = q.where(tuple_(PlanTask.due_date, PlanTask.id) > (date.fromisoformat(due), int(last_id)))
+        except (ValueError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+
+    fallback = False
     if scope == "today":
-        tasks = s.exec(
-            q.where(PlanTask.due_date <= today.isoformat())
-             .order_by(PlanTask.due_date, PlanTask.id)
-        ).all()
-        if not tasks:
-            tasks = s.exec(
-                q.where(PlanTask.due_date > today.isoformat())
-                 .order_by(PlanTask.due_date, PlanTask.id)
-                 .limit(3)
-            ).all()
+        tasks = s.exec(page.where(PlanTask.due_date <= today).limit(limit + 1)).all()
+        if not tasks and not cursor:
+            # nothing due: a short preview of what's next, not a page of "upcoming" (no cursor)
+            tasks = s.exec(q.where(PlanTask.due_date > today).limit(min(3, limit))).all()
+            fallback = True
     elif scope == "upcoming":
-        tasks = s.exec(
-            q.where(PlanTask.due_date > today.isoformat())
-             .order_by(PlanTask.due_date, PlanTask.id)
-        ).all()
+        tasks = s.exec(page.where(PlanTask.due_date > today).limit(limit + 1)).all()
     else:
-        tasks = s.exec(q.order_by(PlanTask.due_date, PlanTask.id)).all()
+        tasks = s.exec(page.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(tasks) > limit and not fallback:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1].due_date.isoformat(), tasks[-1].id)
 
     items = [
         TodayTask(
@@ -57,87 +81,50 @@ def tasks_today(
             resource_ref=t.resource_ref,
         ) for t in tasks
     ]
-    return TodayResponse(plan_id=plan_id, tasks=items)
+    if etag:
+        set_etag(response, etag)
+    return TodayResponse(plan_id=plan_id, tasks=items, next_cursor=next_cursor)
 
 @router.post("/tasks/{task_id}/complete")
-async def complete_task(task_id: int, body: CompleteTaskRequest, s: Session = Depends(get_session)):
-    task = s.get(PlanTask, task_id)
-    if not task:
-        raise HTTPException(404, "Task not found")
-
-    # record progress
-    prog = TaskProgress(
-        task_id=task.id,
-        outcome=body.outcome,
-        notes=body.notes,
-        rating=body.rating,
-        finished_at=datetime.now() if body.outcome == "done" else None,
-        # if you added session_id column on TaskProgress; remove if you didn't
-        session_id=getattr(body, "session_id", None)
-    )
-    s.add(prog)
-    s.commit()
-
-    out_actions: List[dict] = []
-    tips: List[str] = []
-
-    # coach: only when reflection present
-    if body.reflection:
-        # recent short history for context
-        recent = s.exec(
-            select(TaskProgress)
-            .join(PlanTask, PlanTask.id == TaskProgress.task_id)
-            .where(PlanTask.plan_id == task.plan_id)
-            .order_by(TaskProgress.id.desc())
-            .limit(5)
-        ).all()
-        recent_outcomes = [rp.outcome for rp in recent][::-1]
-
-        decision = await coach_decide(
-            task_title=task.title,
-            task_type=task.type,
-            est_minutes=task.est_minutes,
-            due_date=str(task.due_date),
-            reflection=body.reflection.model_dump(),
-            recent_outcomes=recent_outcomes
+async def complete_task(task_id: int, body: CompleteTaskRequest):
+    """
+    Records progress and returns right away. With a reflection, the coach runs
+    as a background job (see app/services/coach_jobs.py): poll
+    GET /jobs/{job_id} or stream GET /jobs/{job_id}/events for its actions and tips.
+    """
+    async with async_session() as s:
+        task = await s.get(PlanTask, task_id)
+        if not task:
+            raise HTTPException(404, "Task not found")
+
+        # record progress
+        prog = TaskProgress(
+            task_id=task.id,
+            outcome=body.outcome,
+            notes=body.notes,
+            rating=body.rating,
+            finished_at=datetime.now() if body.outcome == "done" else None,
+            # if you added session_id column on TaskProgress; remove if you didn't
+            session_id=getattr(body, "session_id", None)
         )
-
-        # apply actions
-        for act in decision.actions:
-            if act.type == "add_task" and act.title:
-                due = date.today() + timedelta(days=act.due_in_days or 2)
-                # append at end
-                last_index = s.exec(
-                    select(PlanTask.order_index)
-                    .where(PlanTask.plan_id == task.plan_id)
-                    .order_by(PlanTask.order_index.desc())
-                ).first() or 0
-                new_t = PlanTask(
-                    plan_id=task.plan_id,
-                    order_index=last_index + 1,
-                    title=act.title,
-                    type="practice",
-                    est_minutes=act.est_minutes or 20,
-                    due_date=due.strftime("%Y-%m-%d"),
-                    resource_ref=act.resource_ref,
-                )
-                s.add(new_t)
-                out_actions.append({"type": "add_task", "task_id": None, "title": act.title})
-
-            elif act.type == "reschedule_task" and act.target_task_id and act.push_days:
-                tgt = s.get(PlanTask, act.target_task_id)
-                if tgt and tgt.plan_id == task.plan_id:
-                    try:
-                        d = datetime.strptime(str(tgt.due_date), "%Y-%m-%d").date()
-                    except Exception:
-                        d = date.today()
-                    d = d + timedelta(days=act.push_days)
-                    tgt.due_date = d.strftime("%Y-%m-%d")
-                    out_actions.append({"type": "reschedule_task", "task_id": tgt.id, "new_due": tgt.due_date})
-
-            elif act.type == "tip" and act.tip:
-                tips.append(act.tip)
-
-        s.commit()
-
-    return {"ok": True, "actions": out_actions, "tips": tips}
\ No newline at end of file
+        s.add(prog)
+        await s.flush()
+        if body.outcome == "done":
+            first = (await s.exec(progress.mark_done(task.id))).first() is not None
+            await s.exec(progress.done_recorded(task.plan_id, first, date.today()))
+
+        # coach: only when reflection present; queued in the same transaction as the progress row
+        job = None
+        if body.reflection:
+            job = CoachJob(
+                task_id=task.id,
+                plan_id=task.plan_id,
+                payload={"reflection": body.reflection.model_dump(), "progress_id": prog.id},
+            )
+            s.add(job)
+        await s.commit()
+
+    if job is None:
+        return {"ok": True, "job_id": None}
+    coach_jobs.wake()
+    return {"ok": True, "job_id": job.id, "status": job.status}
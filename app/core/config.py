@@ -3,9 +3,115 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+
+# connection pool, per engine (the app runs a sync and an async one): persistent connections,
+# extra ones under bursts, seconds to wait for a free one, recycle age in seconds, and a
+# liveness check on checkout. DB_STATEMENT_TIMEOUT_MS caps every statement (0 = no limit);
+# migrations and vector index builds lift it for their own transaction
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
 
 CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",")]
 
 GEN_MODEL = os.getenv("GEN_MODEL", "llama3.2")
-EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
\ No newline at end of file
+EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
+
+# embeddings: chunks per /api/embed request, parallel requests, retries per batch
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "2"))
+
+# pooled HTTP clients (opened in the app lifespan): Ollama, and outbound link checks
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "10"))
+URL_CHECK_TIMEOUT = float(os.getenv("URL_CHECK_TIMEOUT", "5"))
+URL_CHECK_MAX_CONNECTIONS = int(os.getenv("URL_CHECK_MAX_CONNECTIONS", "50"))
+URL_CHECK_MAX_KEEPALIVE = int(os.getenv("URL_CHECK_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# embedding cache: in-process LRU entries, and whether to also persist to Postgres
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "5000"))
+EMBED_CACHE_PERSIST = os.getenv("EMBED_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+
+# streaming ingest: chunks collected before each embed + COPY round
+INGEST_STREAM_BATCH = int(os.getenv("INGEST_STREAM_BATCH", str(EMBED_BATCH_SIZE * EMBED_CONCURRENCY)))
+
+# pgvector ANN index on chunk.embedding: "hnsw" | "ivfflat" | "none"
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "ivfflat").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "0"))       # 0 = size from row count
+# per-query defaults; SearchRequest can override them
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
+
+# lexical / hybrid search: text search config baked into chunk.tsv (set before first start),
+# candidates taken from each ranked list, and the reciprocal-rank-fusion constant
+FTS_CONFIG = os.getenv("FTS_CONFIG", "english")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# filtered vector search: "iterative" uses pgvector >= 0.8 iterative index scans,
+# "prefilter" ranks the filtered candidate set exactly, "auto" picks by installed version
+VECTOR_FILTER_MODE = os.getenv("VECTOR_FILTER_MODE", "auto").lower()
+
+# what the ANN index stores: "full" (vector), "halfvec" (16-bit floats, half the size) or "binary"
+# (1 bit per dimension, 1/32). halfvec/binary need pgvector >= 0.7 and index an expression over
+# chunk.embedding; the index returns VECTOR_OVERSAMPLE x top_k candidates, re-ranked by exact cosine
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "full").lower()
+VECTOR_OVERSAMPLE = int(os.getenv("VECTOR_OVERSAMPLE", "4"))
+
+# resource link validation: global and per-host concurrency, result cache TTLs (seconds)
+URL_CHECK_CONCURRENCY = int(os.getenv("URL_CHECK_CONCURRENCY", "8"))
+URL_CHECK_PER_HOST = int(os.getenv("URL_CHECK_PER_HOST", "2"))
+URL_CACHE_TTL_OK = float(os.getenv("URL_CACHE_TTL_OK", "86400"))
+URL_CACHE_TTL_BAD = float(os.getenv("URL_CACHE_TTL_BAD", "900"))
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", "10000"))
+
+# coach job queue: in-process workers, lease before a running job is re-claimed,
+# attempts before a job is marked failed, idle poll interval (seconds)
+COACH_WORKERS = int(os.getenv("COACH_WORKERS", "2"))
+COACH_JOB_LEASE = float(os.getenv("COACH_JOB_LEASE", "300"))
+COACH_JOB_MAX_ATTEMPTS = int(os.getenv("COACH_JOB_MAX_ATTEMPTS", "3"))
+COACH_JOB_POLL = float(os.getenv("COACH_JOB_POLL", "2"))
+
+# /plan/generate: identical concurrent requests always share one generation; finished
+# plans are also reused for PLAN_CACHE_TTL seconds (0 = coalescing only)
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "120"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "500"))
+
+# ingest chunking: "paragraph" | "sentence" | "markdown" (overridable per ingest), chunk cap and
+# overlap in estimated tokens; keep the cap well under the embedding model's context
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "paragraph").lower()
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "25"))
+
+# vector search backend: "pgvector" (SQL) or "local", an in-process memory-mapped index
+# (app/services/local_index.py, needs numpy) kept under LOCAL_INDEX_DIR as float32 or float16.
+# From LOCAL_INDEX_IVF_MIN rows it probes LOCAL_INDEX_PROBES k-means lists instead of scanning
+# everything; writes by other processes are picked up every LOCAL_INDEX_SYNC_INTERVAL seconds.
+# LOCAL_INDEX_DIR is locked by the first process that opens it; with several workers
+# (uvicorn --workers N) only that one uses it, the others log it and stay on pgvector
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pgvector").lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".vector_index")
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32").lower()
+LOCAL_INDEX_IVF_MIN = int(os.getenv("LOCAL_INDEX_IVF_MIN", "100000"))
+LOCAL_INDEX_PROBES = int(os.getenv("LOCAL_INDEX_PROBES", "16"))
+LOCAL_INDEX_SYNC_INTERVAL = float(os.getenv("LOCAL_INDEX_SYNC_INTERVAL", "30"))
+
+# responses of at least GZIP_MIN_SIZE bytes are gzipped for clients that accept it (0 = off)
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+# GET /health/ready: per-check timeouts (seconds), how long a result is reused, and the share of
+# pool connections (size + overflow) in use above which the worker reports itself saturated
+READY_DB_TIMEOUT = float(os.getenv("READY_DB_TIMEOUT", "1"))
+READY_OLLAMA_TIMEOUT = float(os.getenv("READY_OLLAMA_TIMEOUT", "1"))
+READY_CACHE_TTL = float(os.getenv("READY_CACHE_TTL", "2"))
+READY_POOL_MAX_USAGE = float(os.getenv("READY_POOL_MAX_USAGE", "0.9"))
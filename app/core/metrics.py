@@ -0,0 +1,204 @@
+# app/core/metrics.py
+"""
+In-process Prometheus metrics, rendered in the text exposition format by GET /metrics.
+Small on purpose: counters, gauges and histograms with labels, a pure ASGI middleware
+for per-route latency, and SQLAlchemy hooks that count statements per request.
+"""
+from __future__ import annotations
+import contextvars, threading, time
+from bisect import bisect_left
+
+_registry: list["_Metric"] = []
+
+def _fmt(v: float) -> str:
+    v = float(v)
+    if v == float("inf"):
+        return "+Inf"
+    return str(int(v)) if v.is_integer() else repr(v)
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labelstr(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            out.append(f"{self.name}{_labelstr(self.labels, key)} {_fmt(v)}")
+        return out
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+class Histogram(_Metric):
+    kind = "histogram"
+    LATENCY = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]   # per-bucket counts, sum, count
+            h[0][bisect_left(self.buckets, value)] += 1
+            h[1] += value
+            h[2] += 1
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(k, (list(h[0]), h[1], h[2])) for k, h in self._values.items()]
+        for key, (counts, total, n) in items:
+            cum = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                cum += c
+                le_label = 'le="%s"' % _fmt(le)
+                out.append(f"{self.name}_bucket{_labelstr(self.labels, key, le_label)} {cum}")
+            out.append(f"{self.name}_sum{_labelstr(self.labels, key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labelstr(self.labels, key)} {n}")
+        return out
+
+def render() -> str:
+    return "\n".join(line for m in _registry for line in m.render()) + "\n"
+
+#=======metrics=======
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency, until the body is fully sent", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",))
+
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed")
+DB_STATEMENT_LATENCY = Histogram("db_statement_duration_seconds", "SQL statement execution time")
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request", "SQL statements issued while serving one request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+DB_TIME_PER_REQUEST = Histogram("db_time_per_request_seconds", "SQL execution time while serving one request", ("route",))
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "Connection pool state at scrape time", ("engine", "state"))
+
+OLLAMA_LATENCY = Histogram("ollama_request_duration_seconds", "Ollama call duration", ("endpoint", "model"))
+OLLAMA_TOKENS = Counter("ollama_tokens_total", "Tokens reported by Ollama (prompt_eval_count / eval_count)", ("model", "kind"))
+OLLAMA_ERRORS = Counter("ollama_errors_total", "Failed Ollama calls", ("endpoint",))
+EMBED_BATCH_SIZE = Histogram(
+    "embed_batch_size", "Texts per embedding request sent to Ollama",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+URL_CHECK_LATENCY = Histogram("url_check_duration_seconds", "Resource link probe time (cache misses only)", ("result",))
+
+def record_ollama(endpoint: str, model: str, seconds: float, data: dict | None = None) -> None:
+    OLLAMA_LATENCY.observe(seconds, endpoint=endpoint, model=model)
+    if isinstance(data, dict):
+        if data.get("prompt_eval_count"):
+            OLLAMA_TOKENS.inc(data["prompt_eval_count"], model=model, kind="prompt")
+        if data.get("eval_count"):
+            OLLAMA_TOKENS.inc(data["eval_count"], model=model, kind="completion")
+
+#=======per-request DB accounting=======
+# [statements, seconds] for the request being served; sync endpoints run in a threadpool
+# with a copy of the context, so they share the same list object
+_request_db: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_db", default=None)
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement on a (sync) Engine; pass async_engine.sync_engine for async."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_metrics_t0")
+        if not stack:
+            return
+        dt = time.perf_counter() - stack.pop()
+        DB_STATEMENTS.inc()
+        DB_STATEMENT_LATENCY.observe(dt)
+        acc = _request_db.get()
+        if acc is not None:
+            acc[0] += 1
+            acc[1] += dt
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        conn = ctx.connection
+        if conn is not None and conn.info.get("_metrics_t0"):
+            conn.info["_metrics_t0"].pop()
+
+class MetricsMiddleware:
+    """Pure ASGI (BaseHTTPMiddleware would buffer streaming responses)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = {"code": 500}
+        acc = [0, 0.0]
+        token = _request_db.set(acc)
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            dt = time.perf_counter() - t0
+            HTTP_IN_FLIGHT.dec(method=method)
+            _request_db.reset(token)
+            # route template (set by the router on a match) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            HTTP_REQUESTS.inc(method=method, route=route, status=status["code"])
+            HTTP_LATENCY.observe(dt, method=method, route=route)
+            DB_STATEMENTS_PER_REQUEST.observe(acc[0], route=route)
+            DB_TIME_PER_REQUEST.observe(acc[1], route=route)
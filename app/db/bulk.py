@@ -0,0 +1,23 @@
+import hashlib
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+CHUNK_COPY = "COPY chunk (document_id, order_index, text, content_hash, embedding, meta) FROM STDIN"
+
+def chunk_hash(text: str) -> str:
+    # exact text, so it matches the SQL backfill in migrations.chunk_content_hash
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _vector_literal(vec: list[float]) -> str:
+    return "[" + ",".join(map(str, vec)) + "]"
+
+async def copy_chunks(s: AsyncSession, document_id: int, rows: list[tuple[int, str, list[float]]]) -> None:
+    """
+    Bulk-load (order_index, text, embedding) rows into `chunk` with COPY on the
+    session's connection. Runs inside the session transaction; caller commits.
+    """
+    conn = await s.connection()
+    raw = await conn.get_raw_connection()
+    async with raw.driver_connection.cursor() as cur:
+        async with cur.copy(CHUNK_COPY) as cp:
+            for order_index, text, emb in rows:
+                await cp.write_row((document_id, order_index, text, chunk_hash(text), _vector_literal(emb), None))
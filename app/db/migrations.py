@@ -0,0 +1,142 @@
+# app/db/migrations.py
+"""
+Idempotent schema steps run by init_db after create_all.
+create_all only creates missing tables, so anything added to an existing table
+(columns, non-model indexes, backfills) goes here. Every step must be safe to re-run.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.core.config import FTS_CONFIG
+
+def chunk_tsvector(conn: Connection) -> None:
+    # generated column, deliberately not mapped on Chunk so ORM inserts never try to write it
+    conn.execute(text(f"""
+        ALTER TABLE chunk ADD COLUMN IF NOT EXISTS tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('{FTS_CONFIG}', text)) STORED
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_chunk_tsv ON chunk USING gin (tsv)"))
+
+def document_tag_list(conn: Connection) -> None:
+    conn.execute(text("ALTER TABLE document ADD COLUMN IF NOT EXISTS tag_list varchar[] NOT NULL DEFAULT '{}'"))
+    # backfill from the free-form string, same rules as normalize_tags (minus order)
+    conn.execute(text("""
+        UPDATE document SET tag_list = ARRAY(
+            SELECT DISTINCT lower(regexp_replace(btrim(t), '\\s+', ' ', 'g'))
+            FROM unnest(string_to_array(tags, ',')) AS t
+            WHERE btrim(t) <> ''
+        )
+        WHERE tag_list = '{}' AND coalesce(btrim(tags), '') <> ''
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_document_tag_list ON document USING gin (tag_list)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_document_created_at ON document (created_at)"))
+
+def plan_progress_backfill(conn: Connection) -> None:
+    # summary rows for plans created before planprogress existed; the streak is the
+    # run of consecutive done-days ending at the latest one. Runs on every startup, so
+    # it only ever reads progress of plans that still lack a row, and nothing at all once none do
+    missing = conn.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM plan pl WHERE NOT EXISTS (SELECT 1 FROM planprogress pp WHERE pp.plan_id = pl.id))
+    """)).scalar()
+    if not missing:
+        return
+    conn.execute(text("""
+        WITH todo AS (
+            SELECT pl.id FROM plan pl
+            WHERE NOT EXISTS (SELECT 1 FROM planprogress pp WHERE pp.plan_id = pl.id)
+        ),
+        days AS (
+            SELECT DISTINCT t.plan_id, date(coalesce(tp.finished_at, tp.started_at)) AS day
+            FROM todo JOIN plantask t ON t.plan_id = todo.id JOIN taskprogress tp ON tp.task_id = t.id
+            WHERE tp.outcome = 'done'
+        ),
+        runs AS (
+            SELECT plan_id, day, day - CAST(row_number() OVER (PARTITION BY plan_id ORDER BY day) AS int) AS grp
+            FROM days
+        ),
+        latest AS (
+            SELECT DISTINCT ON (plan_id) plan_id, day, grp FROM runs ORDER BY plan_id, day DESC
+        ),
+        streaks AS (
+            SELECT l.plan_id, l.day AS last_day, count(*) AS n
+            FROM runs r JOIN latest l ON l.plan_id = r.plan_id AND l.grp = r.grp
+            GROUP BY l.plan_id, l.day
+        )
+        INSERT INTO planprogress (plan_id, total, done, streak_days, last_done_date, updated_at)
+        SELECT pl.id,
+               (SELECT count(*) FROM plantask t WHERE t.plan_id = pl.id),
+               (SELECT count(DISTINCT tp.task_id) FROM taskprogress tp JOIN plantask t ON t.id = tp.task_id
+                WHERE t.plan_id = pl.id AND tp.outcome = 'done'),
+               coalesce(s.n, 0), s.last_day, LOCALTIMESTAMP
+        FROM plan pl
+        JOIN todo ON todo.id = pl.id
+        LEFT JOIN streaks s ON s.plan_id = pl.id
+        ON CONFLICT (plan_id) DO NOTHING
+    """))
+
+def _column_type(conn: Connection, table: str, column: str) -> str | None:
+    return conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c
+    """), {"t": table, "c": column}).scalar()
+
+def plantask_due_date_and_done(conn: Connection) -> None:
+    if _column_type(conn, "plantask", "due_date") != "date":
+        # due_date used to be an ISO string; anything unparseable falls back to the plan's creation day
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION pg_temp.try_date(s text) RETURNS date AS $$
+            BEGIN RETURN s::date; EXCEPTION WHEN others THEN RETURN NULL; END
+            $$ LANGUAGE plpgsql IMMUTABLE
+        """))
+        conn.execute(text("""
+            UPDATE plantask t SET due_date = to_char(p.created_at, 'YYYY-MM-DD')
+            FROM plan p
+            WHERE p.id = t.plan_id AND pg_temp.try_date(t.due_date) IS NULL
+        """))
+        conn.execute(text("ALTER TABLE plantask ALTER COLUMN due_date TYPE date USING due_date::date"))
+
+    if _column_type(conn, "plantask", "done") is None:
+        conn.execute(text("ALTER TABLE plantask ADD COLUMN done boolean NOT NULL DEFAULT false"))
+        conn.execute(text("""
+            UPDATE plantask t SET done = true
+            WHERE EXISTS (SELECT 1 FROM taskprogress tp WHERE tp.task_id = t.id AND tp.outcome = 'done')
+        """))
+
+    # today/upcoming/all only ever read open tasks of one plan, in due order
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_plantask_open_due ON plantask (plan_id, due_date, id) WHERE NOT done"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_taskprogress_task ON taskprogress (task_id, outcome)"))
+
+def plan_keyset_index(conn: Connection) -> None:
+    # GET /plans pages newest first on (created_at, id)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_plan_created_id ON plan (created_at DESC, id DESC)"))
+
+def chunk_content_hash(conn: Connection) -> None:
+    conn.execute(text("ALTER TABLE chunk ADD COLUMN IF NOT EXISTS content_hash varchar(64)"))
+    # same digest as bulk.chunk_hash
+    conn.execute(text("""
+        UPDATE chunk SET content_hash = encode(sha256(convert_to(text, 'UTF8')), 'hex')
+        WHERE content_hash IS NULL
+    """))
+
+def plan_progress_version(conn: Connection) -> None:
+    conn.execute(text("ALTER TABLE planprogress ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1"))
+
+def document_chunking(conn: Connection) -> None:
+    conn.execute(text("ALTER TABLE document ADD COLUMN IF NOT EXISTS chunking varchar(16)"))
+    conn.execute(text("ALTER TABLE document ADD COLUMN IF NOT EXISTS chunk_max_tokens integer"))
+
+MIGRATIONS = [
+    chunk_tsvector,
+    document_tag_list,
+    plan_progress_backfill,
+    plantask_due_date_and_done,
+    plan_keyset_index,
+    chunk_content_hash,
+    plan_progress_version,
+    document_chunking,
+]
+
+def run_migrations(conn: Connection) -> None:
+    for step in MIGRATIONS:
+        step(conn)
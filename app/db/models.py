@@ -1,6 +1,8 @@
 from typing import Optional, List
 from datetime import datetime, date
 from sqlmodel import SQLModel, Field, Column, Relationship, JSON
+from sqlalchemy import String
+from sqlalchemy.dialects.postgresql import ARRAY
 from pgvector.sqlalchemy import Vector
 
 #=======User entity=======
@@ -51,17 +53,39 @@ class PlanTask(SQLModel, table=True):
     title: str
     type: str
     est_minutes: int
-    due_date: str
+    due_date: date
     resource_ref: Optional[str] = None
+    # denormalized: True once any 'done' progress exists for the task (set by complete_task)
+    done: bool = Field(default=False, sa_column_kwargs={"server_default": "false"})
 
     plan: Optional[Plan] = Relationship(back_populates="tasks")
 
+class PlanProgress(SQLModel, table=True):
+    # per-plan summary kept in step with tasks/progress writes (app/db/progress.py)
+    plan_id: int = Field(foreign_key="plan.id", primary_key=True, ondelete="CASCADE")
+    total: int = 0                          # tasks in the plan
+    done: int = 0                           # distinct tasks with a 'done' outcome
+    streak_days: int = 0                    # consecutive done-days ending at last_done_date
+    last_done_date: Optional[date] = None
+    # bumped by every write that changes what the plan read endpoints return; drives their ETags
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    updated_at: datetime = Field(default_factory=datetime.now)
+
 #=======RAG document entities=======
 class Document(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     tags: Optional[str] = None
+    # normalized form of `tags` (see app/utils/tags.py), GIN-indexed for search filters
+    tag_list: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(ARRAY(String), nullable=False, server_default="{}")
+    )
     created_at: datetime = Field(default_factory=datetime.now)
+    # how the text was chunked; PUT /content/{id} re-chunks the same way unless told otherwise
+    # (NULL on documents ingested before this was recorded: CHUNK_STRATEGY / CHUNK_MAX_TOKENS)
+    chunking: Optional[str] = Field(default=None, max_length=16)
+    chunk_max_tokens: Optional[int] = None
 
     #child
     chunks: List["Chunk"] = Relationship(back_populates="document", sa_relationship_kwargs={"cascade":"all, delete-orphan"})
@@ -71,6 +95,8 @@ class Chunk(SQLModel, table=True):
     document_id: int = Field(foreign_key="document.id", index=True)
     order_index: int
     text: str
+    # sha256 of `text`; PUT /content/{id} diffs on it to re-embed only changed chunks
+    content_hash: Optional[str] = Field(default=None, max_length=64)
 
     embedding: list[float] = Field(sa_column=Column(Vector(768)))
     meta: Optional[dict] = Field(default=None, sa_column=Column(JSON))
@@ -93,3 +119,26 @@ class TaskProgress(SQLModel, table=True):
     notes: Optional[str] = None
     rating: Optional[int] = Field(default=None)
     session_id: int | None = Field(default=None, foreign_key="studysession.id")
+
+#=======Embedding cache entity=======
+class EmbeddingCache(SQLModel, table=True):
+    # keyed by (model, sha256 of normalized text); see app/services/embed_cache.py
+    model: str = Field(primary_key=True)
+    text_hash: str = Field(primary_key=True)
+    embedding: list[float] = Field(sa_column=Column(Vector(768)))
+    created_at: datetime = Field(default_factory=datetime.now)
+
+#=======Background job entities=======
+class CoachJob(SQLModel, table=True):
+    # DB-backed queue for coach decisions; see app/services/coach_jobs.py
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_id: int = Field(index=True)
+    plan_id: int = Field(index=True)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON))   # {"reflection": {...}}
+    status: str = Field(default="queued", index=True)   # queued | running | done | failed
+    attempts: int = 0
+    locked_until: Optional[datetime] = None            # lease; expired running jobs are re-claimed
+    result: Optional[dict] = Field(default=None, sa_column=Column(JSON))  # {"actions": [...], "tips": [...]}
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,61 @@
+# app/db/progress.py
+"""
+Statements that keep `planprogress` in step with plan tasks and outcomes.
+They are plain SQL constructs so the sync routers and the async task/coach
+code can run them inside their own transactions via `s.exec(...)`.
+"""
+from datetime import date, datetime
+from sqlalchemy import text, update, false
+from sqlmodel import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.db.models import PlanProgress, PlanTask
+
+def tasks_added(counts: dict[int, int]):
+    """Upsert: add counts[plan_id] to total (creates the row for a new plan, even with 0) and bump version."""
+    now = datetime.now()
+    stmt = pg_insert(PlanProgress).values(
+        [{"plan_id": pid, "total": n, "updated_at": now} for pid, n in counts.items()]
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[PlanProgress.plan_id],
+        set_={"total": PlanProgress.total + stmt.excluded.total, "version": PlanProgress.version + 1,
+              "updated_at": stmt.excluded.updated_at},
+    )
+
+_DONE = text("""
+    UPDATE planprogress p SET
+        done = p.done + CASE WHEN :first THEN 1 ELSE 0 END,
+        streak_days = CASE
+            WHEN p.last_done_date >= CAST(:day AS date) THEN p.streak_days
+            WHEN p.last_done_date = CAST(:day AS date) - 1 THEN p.streak_days + 1
+            ELSE 1 END,
+        last_done_date = GREATEST(p.last_done_date, CAST(:day AS date)),
+        version = p.version + 1,
+        updated_at = :now
+    WHERE p.plan_id = :plan_id
+""")
+
+def done_recorded(plan_id: int, first: bool, day: date):
+    """first: this completion flipped plantask.done (see mark_done), so the task counts now."""
+    return _DONE.bindparams(plan_id=plan_id, first=first, day=day, now=datetime.now())
+
+def mark_done(task_id: int):
+    # returns the id only for the first completion; a concurrent second one waits on the
+    # row lock, re-checks NOT done and gets nothing back
+    return (
+        update(PlanTask)
+        .where(PlanTask.id == task_id, PlanTask.done == false())
+        .values(done=True)
+        .returning(PlanTask.id)
+    )
+
+def plan_changed(plan_id: int):
+    # any other write to a plan's tasks (e.g. a coach reschedule): invalidates cached reads
+    return (
+        update(PlanProgress)
+        .where(PlanProgress.plan_id == plan_id)
+        .values(version=PlanProgress.version + 1, updated_at=datetime.now())
+    )
+
+def version_of(plan_id: int):
+    return select(PlanProgress.version).where(PlanProgress.plan_id == plan_id)
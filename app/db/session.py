@@ -1,24 +1,183 @@
+import math, re
 from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
-from app.core.config import DATABASE_URL
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.migrations import run_migrations
+from app.core.metrics import instrument_engine
+from app.core.config import (
+    DATABASE_URL, VECTOR_INDEX, HNSW_M, HNSW_EF_CONSTRUCTION, IVFFLAT_LISTS, HNSW_EF_SEARCH, IVFFLAT_PROBES,
+    VECTOR_FILTER_MODE, VECTOR_STORAGE, VECTOR_OVERSAMPLE,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+)
 
-engine = create_engine(DATABASE_URL, echo=False)
+def _engine_options() -> dict:
+    opts = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        # server-side default for the session; SET LOCAL overrides it per transaction
+        opts["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return opts
+
+engine = create_engine(DATABASE_URL, echo=False, **_engine_options())
+# psycopg 3 speaks async natively, so the same URL drives both engines
+async_engine = create_async_engine(DATABASE_URL, echo=False, **_engine_options())
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+VECTOR_INDEX_NAME = "idx_chunk_embedding_cosine"
+
+# installed pgvector version, read by init_db
+pgvector_version: tuple[int, ...] = (0,)
+
+def iterative_scan_enabled() -> bool:
+    if VECTOR_FILTER_MODE == "auto":
+        return pgvector_version >= (0, 8)
+    return VECTOR_FILTER_MODE == "iterative"
+
+EMBEDDING_DIM = 768  # chunk.embedding is vector(768)
+
+# what the ANN index is built over, and its operator class, per VECTOR_STORAGE
+STORAGE_INDEX = {
+    "full": ("embedding", "vector_cosine_ops"),
+    "halfvec": (f"(embedding::halfvec({EMBEDDING_DIM}))", "halfvec_cosine_ops"),
+    "binary": (f"(binary_quantize(embedding)::bit({EMBEDDING_DIM}))", "bit_hamming_ops"),
+}
+
+def vector_storage() -> str:
+    # halfvec and binary_quantize arrived in pgvector 0.7
+    if VECTOR_STORAGE not in STORAGE_INDEX:
+        raise ValueError(f"Unknown VECTOR_STORAGE: {VECTOR_STORAGE}")
+    return VECTOR_STORAGE if pgvector_version >= (0, 7) else "full"
+
+def ann_candidates(top_k: int, storage: str | None = None) -> int:
+    # quantized indexes return an oversampled candidate set that is re-ranked exactly
+    return top_k if (storage or vector_storage()) == "full" else top_k * max(1, VECTOR_OVERSAMPLE)
+
+def ivfflat_lists_for(rows: int) -> int:
+    # pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+def ensure_vector_index(conn: Connection, strategy: str = VECTOR_INDEX, m: int = HNSW_M,
+                        ef_construction: int = HNSW_EF_CONSTRUCTION, lists: int = IVFFLAT_LISTS,
+                        storage: str | None = None) -> str:
+    """
+    Make idx_chunk_embedding_cosine match the requested strategy and storage, rebuilding
+    it when the method, operator class or build parameters changed. Auto-sized IVFFlat
+    (lists=0) is only rebuilt once the row count has drifted more than 2x from what it
+    was sized for. Returns a short description of what was done.
+    """
+    current = conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE tablename = 'chunk' AND indexname = :n"),
+        {"n": VECTOR_INDEX_NAME},
+    ).scalar()
+
+    if strategy == "none":
+        if current:
+            conn.execute(text(f"DROP INDEX {VECTOR_INDEX_NAME}"))
+            return "dropped"
+        return "none"
+
+    storage = storage or vector_storage()
+    expr, opclass = STORAGE_INDEX[storage]
+    label = strategy if storage == "full" else f"{strategy}/{storage}"
+
+    if strategy == "hnsw":
+        ddl = f"USING hnsw ({expr} {opclass}) WITH (m = {m}, ef_construction = {ef_construction})"
+        wanted = {"m": m, "ef_construction": ef_construction}
+    elif strategy == "ivfflat":
+        if lists <= 0:
+            rows = conn.execute(text("SELECT count(*) FROM chunk")).scalar() or 0
+            lists = ivfflat_lists_for(rows)
+            wanted = None  # compared with tolerance below
+        else:
+            wanted = {"lists": lists}
+        ddl = f"USING ivfflat ({expr} {opclass}) WITH (lists = {lists})"
+    else:
+        raise ValueError(f"Unknown VECTOR_INDEX strategy: {strategy}")
+
+    if current and f"USING {strategy} " in current and f" {opclass})" in current:
+        params = {k: int(v) for k, v in re.findall(r"(\w+)='?(\d+)'?", current.split("WITH", 1)[-1])}
+        if wanted is None:
+            have = params.get("lists", 0)
+            if have and have / 2 <= lists <= have * 2:
+                return f"{label} kept"
+        elif all(params.get(k) == v for k, v in wanted.items()):
+            return f"{label} kept"
+
+    # builds can run for minutes on a large table
+    conn.execute(text("SET LOCAL statement_timeout = 0"))
+    if current:
+        conn.execute(text(f"DROP INDEX {VECTOR_INDEX_NAME}"))
+    conn.execute(text(f"CREATE INDEX {VECTOR_INDEX_NAME} ON chunk {ddl}"))
+    return f"{label} built {ddl.split('WITH ')[1]}"
 
 def init_db() -> None:
+    global pgvector_version
     # Create all tables from models
     SQLModel.metadata.create_all(engine)
 
-    # Ensure pgvector index exists
     with engine.connect() as conn:
-        conn.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_chunk_embedding_cosine
-            ON chunk
-            USING ivfflat (embedding vector_cosine_ops)
-            WITH (lists = 100);
-        """))
+        ver = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar() or "0"
+        pgvector_version = tuple(int(p) for p in re.findall(r"\d+", ver))
+
+        # backfills touch whole tables
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        run_migrations(conn)
         conn.commit()
-        print("pgvector IVFFlat index ensured.")
+
+        if vector_storage() != VECTOR_STORAGE:
+            print(f"VECTOR_STORAGE={VECTOR_STORAGE} needs pgvector >= 0.7 (installed: {ver}); indexing full vectors.")
+
+        # Ensure pgvector index matches the configured strategy
+        result = ensure_vector_index(conn)
+        conn.commit()
+        print(f"pgvector index: {result}.")
+
+async def apply_search_params(s: AsyncSession, top_k: int, ef_search: int | None = None,
+                              probes: int | None = None, filtered: bool = False) -> None:
+    """
+    Transaction-local ANN knobs for the next query (hnsw.ef_search / ivfflat.probes).
+    Filtered queries also get iterative index scans when enabled, so the scan keeps
+    going until top_k rows pass the filter (results may come back slightly out of order).
+    """
+    settings: dict[str, str] = {}
+    if VECTOR_INDEX == "hnsw":
+        # ef_search below the candidate count caps the result count
+        settings["hnsw.ef_search"] = str(max(ef_search or HNSW_EF_SEARCH, ann_candidates(top_k)))
+    elif VECTOR_INDEX == "ivfflat":
+        settings["ivfflat.probes"] = str(probes or IVFFLAT_PROBES)
+    if filtered and VECTOR_INDEX != "none" and iterative_scan_enabled():
+        settings[f"{VECTOR_INDEX}.iterative_scan"] = "relaxed_order"
+    for name, value in settings.items():
+        await s.exec(text("SELECT set_config(:n, :v, true)"), params={"n": name, "v": value})
+
+def pool_stats(e=None) -> dict:
+    pool = (e or engine).pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "idle": pool.checkedin(),
+    }
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def async_session() -> AsyncSession:
+    # use as `async with async_session() as s:` around DB work only, never around an LLM/embedding await
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+async def get_async_session():
+    async with async_session() as session:
+        yield session
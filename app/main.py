@@ -1,23 +1,41 @@
 # app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import RedirectResponse, JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 
-from app.core.config import CORS_ORIGINS
-from app.db.session import init_db
-from app.api import health, plan, plans, rag, sessions, tasks, plans_progress
+from app.core.config import CORS_ORIGINS, GZIP_MIN_SIZE
+from app.core.metrics import MetricsMiddleware
+from app.db.session import init_db, async_engine
+from app.services.http_clients import open_clients, close_clients
+from app.services.coach_jobs import start_workers, stop_workers
+from app.services import local_index
+from app.api import health, plan, plans, rag, sessions, tasks, plans_progress, jobs, metrics
 from app.db import models
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     init_db()
+    await open_clients()
+    await local_index.open_index()
+    start_workers()
     yield
-    # Shutdown logic (if needed later)
+    # Shutdown logic
+    await stop_workers()
+    await local_index.close_index()
+    await close_clients()
+    await async_engine.dispose()
     print("Shutting down...")
 
-app = FastAPI(title="AI Tutor API", lifespan=lifespan)
+try:
+    import orjson  # noqa: F401  optional: much faster serialization of large plan/task payloads
+    DefaultResponse = ORJSONResponse
+except ImportError:
+    DefaultResponse = JSONResponse
+
+app = FastAPI(title="AI Tutor API", lifespan=lifespan, default_response_class=DefaultResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,16 +43,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # custom response headers are hidden from cross-origin JS unless listed here
+    expose_headers=["X-Plan-Cache", "Age"],
 )
+# Starlette >= 0.46 (pinned in pyproject) never compresses SSE (text/event-stream)
+if GZIP_MIN_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+# outermost, so latency covers CORS handling and compression too
+app.add_middleware(MetricsMiddleware)
 
 # Routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(plan.router)
+app.include_router(plans_progress.router)   # before plans: /plans/progress vs /plans/{plan_id}
 app.include_router(plans.router)
 app.include_router(rag.router)
 app.include_router(sessions.router)
 app.include_router(tasks.router)
-app.include_router(plans_progress.router)
+app.include_router(jobs.router)
 
 @app.get("/", include_in_schema=False)
 def redirect_to_docs():
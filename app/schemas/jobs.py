@@ -0,0 +1,14 @@
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+class CoachJobRead(BaseModel):
+    id: int
+    task_id: int
+    plan_id: int
+    status: Literal["queued", "running", "done", "failed"]
+    attempts: int
+    result: Optional[dict] = None   # {"actions": [...], "tips": [...]} once done
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -1,3 +1,4 @@
+from datetime import date
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
@@ -5,7 +6,7 @@ class PlanItemTaskIn(BaseModel):
     title: str
     type: str
     est_minutes: int = Field(ge=5, le=240)
-    due_date: str
+    due_date: date
     resource_ref: Optional[str] = None
 
 class PlanCreate(BaseModel):
@@ -21,6 +22,10 @@ class PlanSummary(BaseModel):
     id: int
     name: str
 
+class PlanPage(BaseModel):
+    items: List[PlanSummary]
+    next_cursor: Optional[str] = None   # pass back as ?cursor= for the next page; None on the last page
+
 class PlanTaskOut(PlanItemTaskIn):
     id: int
     order_index: int
@@ -38,4 +43,10 @@ class PlanRead(BaseModel):
     minutes: int
     deadline: str
     milestones: List[PlanMilestoneOut]
-    tasks: List[PlanTaskOut]
\ No newline at end of file
+    tasks: List[PlanTaskOut]
+
+class PlanBatchCreate(BaseModel):
+    plans: List[PlanCreate] = Field(min_length=1, max_length=5000)
+
+class PlanBatchResult(BaseModel):
+    ids: List[int]
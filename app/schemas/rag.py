@@ -1,25 +1,90 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
+ChunkStrategy = Literal["paragraph", "sentence", "markdown"]
+
 class IngestRequest(BaseModel):
     title: str
     text: str
     tags: Optional[str] = None
+    # chunking overrides; default to CHUNK_STRATEGY / CHUNK_MAX_TOKENS
+    chunking: Optional[ChunkStrategy] = None
+    max_tokens: Optional[int] = Field(default=None, ge=32, le=2048)
 
 class IngestResponse(BaseModel):
     document_id: int
     chunks: int
 
+class UpdateContentRequest(BaseModel):
+    text: str
+    # title/tags are left as they are when omitted
+    title: Optional[str] = None
+    tags: Optional[str] = None
+    # default to the document's own chunking (as ingested, or as last updated)
+    chunking: Optional[ChunkStrategy] = None
+    max_tokens: Optional[int] = Field(default=None, ge=32, le=2048)
+
+class UpdateContentResponse(IngestResponse):
+    kept: int       # unchanged chunks, embedding reused (order_index updated if they moved)
+    moved: int
+    added: int      # new or edited chunks
+    removed: int
+    embedded: int   # distinct new texts embedded and stored (the embedding cache may still answer some)
+
 class SearchRequest(BaseModel):
     query: str
     top_k: int = Field(default=6, ge=1, le=20)
+    # vector: embedding distance; lexical: full-text only (no Ollama call); hybrid: both, rank-fused
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+    # ANN overrides for this query (HNSW_EF_SEARCH / IVFFLAT_PROBES otherwise)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    probes: Optional[int] = Field(default=None, ge=1, le=1000)
+    # filters: documents carrying all `tags`, within `document_ids`, created in [created_after, created_before)
+    tags: Optional[List[str]] = None
+    document_ids: Optional[List[int]] = Field(default=None, max_length=1000)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
 
 class SearchHit(BaseModel):
     id: int
     document_id: int
     title: str
     chunk: str
-    score: float  # cosine distance (lower = closer)
+    score: float  # vector: cosine distance (lower = closer); lexical/hybrid: rank score (higher = better)
 
 class SearchResponse(BaseModel):
-    hits: List[SearchHit]
\ No newline at end of file
+    hits: List[SearchHit]
+
+class BatchQuery(BaseModel):
+    query: str
+    top_k: int = Field(default=6, ge=1, le=20)
+
+class BatchSearchRequest(BaseModel):
+    # vector search only; filters and ANN overrides apply to every query
+    queries: List[BatchQuery] = Field(min_length=1, max_length=256)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    probes: Optional[int] = Field(default=None, ge=1, le=1000)
+    tags: Optional[List[str]] = None
+    document_ids: Optional[List[int]] = Field(default=None, max_length=1000)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class BatchSearchResult(BaseModel):
+    query: str
+    hits: List[SearchHit]
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchResult]  # same order as the request's queries
+
+class StreamIngestResponse(IngestResponse):
+    ingest_id: str
+    bytes: int
+
+class IngestProgress(BaseModel):
+    ingest_id: str
+    status: str            # 'running' | 'done' | 'failed'
+    document_id: Optional[int] = None
+    bytes: int = 0
+    chunks: int = 0        # chunks embedded and stored so far
+    error: Optional[str] = None
@@ -11,4 +11,5 @@ class TodayTask(BaseModel):
 
 class TodayResponse(BaseModel):
     plan_id: int
-    tasks: List[TodayTask]
\ No newline at end of file
+    tasks: List[TodayTask]
+    next_cursor: Optional[str] = None   # pass back as ?cursor= for the next page; None on the last page
\ No newline at end of file
@@ -1,21 +1,236 @@
-import re
-from typing import List
-
-def split_into_chunks(text: str, chunk_size: int = 800, overlap: int = 100) -> List[str]:
-    """Simple, fast chunker: paragraph-aware, hard wrap to ~chunk_size with overlap."""
-    paras = [p.strip() for p in re.split(r"\n{2,}", text) if p.strip()]
-    chunks: List[str] = []
-    buf = ""
-    for p in paras:
-        if not buf:
-            buf = p
-        elif len(buf) + 2 + len(p) <= chunk_size:
-            buf += "\n\n" + p
+import math, re
+from typing import AsyncIterator, Iterator, List, Literal
+from app.core.config import CHUNK_STRATEGY, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+Strategy = Literal["paragraph", "sentence", "markdown"]
+STRATEGIES = ("paragraph", "sentence", "markdown")
+
+_PARA_BREAK = re.compile(r"\n[ \t]*\n\s*")
+# end of sentence: . ! ? (optionally followed by a closing quote/bracket), whitespace, then
+# something that starts a sentence; a line break inside a paragraph also ends one (lists etc.)
+_SENTENCE_BREAK = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])|\s*\n\s*")
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.+?)\s*#*\s*$")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative token estimate without a tokenizer: the larger of words + punctuation
+    marks and ~4 characters per token (what BPE vocabularies average on English).
+    """
+    return max(len(_TOKEN.findall(text)), math.ceil(len(text) / 4))
+
+def _word_tokens(w: str) -> int:
+    # per word incl. its trailing space; summing these never underestimates the joined text
+    return max(len(_TOKEN.findall(w)), math.ceil((len(w) + 1) / 4))
+
+def _sentence_units(text: str) -> Iterator[tuple[str, str]]:
+    # (separator before, sentence); line breaks are kept as "\n" so lists and code stay readable
+    start, brk = 0, ""
+    for m in _SENTENCE_BREAK.finditer(text):
+        s = text[start:m.start()].strip()
+        if s:
+            yield brk, s
+        brk = "\n" if "\n" in m.group() else " "
+        start = m.end()
+    s = text[start:].strip()
+    if s:
+        yield brk, s
+
+def split_sentences(text: str) -> List[str]:
+    return [s for _, s in _sentence_units(text)]
+
+def _split_words(text: str, budget: int) -> Iterator[tuple[str, str]]:
+    """
+    Cut a sentence that alone exceeds the budget at word boundaries; a single
+    over-long token (URL, blob) is cut by characters. Yields (separator before, piece).
+    """
+    cur: List[str] = []
+    cur_n = 0
+    sep = ""
+    for w in text.split():
+        n = _word_tokens(w)
+        if n > budget:
+            if cur:
+                yield sep, " ".join(cur)
+                cur, cur_n, sep = [], 0, " "
+            for i in range(0, len(w), budget):
+                yield sep, w[i:i + budget]
+                sep = ""
+            sep = " "
+            continue
+        if cur and cur_n + n > budget:
+            yield sep, " ".join(cur)
+            cur, cur_n, sep = [], 0, " "
+        cur.append(w)
+        cur_n += n
+    if cur:
+        yield sep, " ".join(cur)
+
+def _paragraphs(text: str) -> Iterator[str]:
+    start = 0
+    for m in _PARA_BREAK.finditer(text):
+        yield text[start:m.start()]
+        start = m.end()
+    yield text[start:]
+
+class Chunker:
+    """
+    Packs units (paragraphs or sentences) into chunks of at most max_tokens
+    (estimated). feed() takes one paragraph at a time and yields finished chunks,
+    so the caller decides how text arrives. Units are kept in a list and joined
+    once per chunk. Overlap is whole trailing sentences, never a cut word.
+
+    - paragraph: whole paragraphs; one over the budget is packed sentence by sentence
+    - sentence:  sliding window of sentences, ignoring paragraph boundaries
+    - markdown:  paragraph packing that never crosses a heading; each chunk is
+                 prefixed with its heading path ("Intro > Setup") so it stands alone
+    """
+
+    def __init__(self, strategy: Strategy = CHUNK_STRATEGY, max_tokens: int = CHUNK_MAX_TOKENS,
+                 overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+        self.strategy = strategy
+        self.max_tokens = max(16, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self._units: List[tuple[str, str, int]] = []   # (separator before, text, tokens)
+        self._tokens = 0
+        self._fresh = 0                                # units not emitted yet (the rest is overlap)
+        self._headings: List[tuple[int, str]] = []
+        self._prefix = ""
+        self._prefix_tokens = 0
+        self._in_fence = False
+
+    def _budget(self) -> int:
+        return max(16, self.max_tokens - self._prefix_tokens)
+
+    def feed(self, block: str) -> Iterator[str]:
+        block = block.strip()
+        if not block:
+            return
+        if self.strategy == "markdown":
+            yield from self._feed_markdown(block)
         else:
-            chunks.append(buf)
-            # start new with overlap tail
-            tail = buf[-overlap:]
-            buf = (tail + "\n\n" + p) if overlap > 0 else p
-    if buf:
-        chunks.append(buf)
-    return chunks
\ No newline at end of file
+            yield from self._feed_text(block)
+
+    def finish(self) -> Iterator[str]:
+        if self._fresh:
+            yield self._emit()
+        self._units, self._tokens, self._fresh = [], 0, 0
+
+    def _feed_text(self, block: str) -> Iterator[str]:
+        if self.strategy != "sentence":
+            n = estimate_tokens(block)
+            if n <= self._budget() - 1:
+                yield from self._push("\n\n", block, n)
+                return
+        first = True
+        for sep, s in _sentence_units(block):
+            sep = "\n\n" if first else sep
+            first = False
+            n = estimate_tokens(s)
+            if n > self._budget() - 1:
+                for i, (psep, piece) in enumerate(_split_words(s, self._budget() - 1)):
+                    yield from self._push(sep if i == 0 else psep, piece, estimate_tokens(piece))
+            else:
+                yield from self._push(sep, s, n)
+
+    def _feed_markdown(self, block: str) -> Iterator[str]:
+        body: List[str] = []
+        for line in block.split("\n"):
+            if line.lstrip().startswith(("```", "~~~")):
+                self._in_fence = not self._in_fence
+            m = None if self._in_fence else _HEADING.match(line)
+            if not m:
+                body.append(line)
+                continue
+            if body:
+                yield from self._feed_text("\n".join(body))
+                body = []
+            yield from self._section(len(m.group(1)), m.group(2))
+        if body:
+            yield from self._feed_text("\n".join(body))
+
+    def _section(self, level: int, title: str) -> Iterator[str]:
+        # a heading closes the current chunk; no overlap across sections
+        yield from self.finish()
+        while self._headings and self._headings[-1][0] >= level:
+            self._headings.pop()
+        self._headings.append((level, title))
+        self._prefix = " > ".join(t for _, t in self._headings) + "\n\n"
+        self._prefix_tokens = estimate_tokens(self._prefix)
+
+    def _push(self, sep: str, text: str, n: int) -> Iterator[str]:
+        n += 1   # room for the separator, so the joined chunk stays within the budget
+        budget = self._budget()
+        if self._fresh and self._tokens + n > budget:
+            yield self._emit()
+        if self._tokens + n > budget:
+            # carried-over overlap doesn't fit next to this unit: drop it
+            self._units, self._tokens = [], 0
+        self._units.append((sep, text, n))
+        self._tokens += n
+        self._fresh += 1
+
+    def _emit(self) -> str:
+        units = self._units
+        out = self._prefix + units[0][1] + "".join(sep + t for sep, t, _ in units[1:])
+
+        keep: List[tuple[str, str, int]] = []
+        kept = 0
+        if self.overlap_tokens:
+            for sep, t, n in reversed(units):
+                if kept + n <= self.overlap_tokens:
+                    keep.insert(0, (sep, t, n))
+                    kept += n
+                    continue
+                # unit too big to carry whole: take its trailing sentences
+                for s in reversed(split_sentences(t)):
+                    sn = estimate_tokens(s)
+                    if kept + sn > self.overlap_tokens:
+                        break
+                    keep.insert(0, (" ", s, sn))
+                    kept += sn
+                break
+        self._units, self._tokens, self._fresh = keep, kept, 0
+        return out
+
+def iter_chunks(text: str, strategy: Strategy = CHUNK_STRATEGY, max_tokens: int = CHUNK_MAX_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    chunker = Chunker(strategy, max_tokens, overlap_tokens)
+    for p in _paragraphs(text):
+        yield from chunker.feed(p)
+    yield from chunker.finish()
+
+def split_into_chunks(text: str, strategy: Strategy = CHUNK_STRATEGY, max_tokens: int = CHUNK_MAX_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    return list(iter_chunks(text, strategy, max_tokens, overlap_tokens))
+
+async def iter_chunks_async(pieces: AsyncIterator[str], strategy: Strategy = CHUNK_STRATEGY,
+                            max_tokens: int = CHUNK_MAX_TOKENS,
+                            overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> AsyncIterator[str]:
+    """
+    iter_chunks over text that arrives in pieces (e.g. an upload). Only the current
+    paragraph and chunk are buffered; a paragraph that keeps growing past a few
+    chunks' worth of text is fed early at a sentence (or word) boundary.
+    """
+    chunker = Chunker(strategy, max_tokens, overlap_tokens)
+    limit = max_tokens * 4 * 4
+    pending = ""
+    async for piece in pieces:
+        pending += piece
+        blocks = _PARA_BREAK.split(pending)
+        pending = blocks.pop()  # may still be growing
+        while len(pending) > limit:
+            cut = max(pending.rfind(". ", 0, limit), pending.rfind("\n", 0, limit))
+            cut = cut + 1 if cut > 0 else pending.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            blocks.append(pending[:cut])
+            pending = pending[cut:]
+        for b in blocks:
+            for c in chunker.feed(b):
+                yield c
+    for c in chunker.feed(pending):
+        yield c
+    for c in chunker.finish():
+        yield c
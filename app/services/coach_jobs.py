@@ -0,0 +1,222 @@
+# app/services/coach_jobs.py
+"""
+Postgres-backed queue for coach decisions.
+
+/tasks/{id}/complete inserts a `coachjob` row in the same transaction as the
+progress write; COACH_WORKERS asyncio workers claim rows with
+FOR UPDATE SKIP LOCKED under a lease, run the coach and apply its actions.
+Rows whose lease expired (worker crashed or restarted) are claimed again.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import List
+from sqlalchemy import text
+from sqlmodel import select
+from app.core.config import COACH_WORKERS, COACH_JOB_LEASE, COACH_JOB_MAX_ATTEMPTS, COACH_JOB_POLL
+from app.db.session import async_session
+from app.db.models import CoachJob, PlanTask, TaskProgress
+from app.db import progress
+from app.agents.coach import coach_decide
+from app.schemas.coach import CoachDecision
+
+CLAIM = text("""
+    UPDATE coachjob
+    SET status = 'running', attempts = attempts + 1,
+        locked_until = LOCALTIMESTAMP + make_interval(secs => :lease), updated_at = LOCALTIMESTAMP
+    WHERE id = (
+        SELECT id FROM coachjob
+        WHERE status IN ('queued', 'running')
+          AND (locked_until IS NULL OR locked_until < LOCALTIMESTAMP)
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, task_id, payload, attempts
+""")
+
+_wake = asyncio.Event()
+_workers: List[asyncio.Task] = []
+_watchers: dict[int, asyncio.Event] = {}
+
+def wake() -> None:
+    """Call after committing a new job so an idle worker picks it up without waiting for the poll."""
+    _wake.set()
+
+def _notify(job_id: int) -> None:
+    ev = _watchers.get(job_id)
+    if ev:
+        ev.set()
+
+async def wait_for_change(job_id: int, timeout: float) -> None:
+    # woken by workers in this process; other processes' updates are seen on the next poll
+    ev = _watchers.setdefault(job_id, asyncio.Event())
+    try:
+        await asyncio.wait_for(ev.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    if ev.is_set() and _watchers.get(job_id) is ev:
+        del _watchers[job_id]
+
+def forget(job_id: int) -> None:
+    _watchers.pop(job_id, None)
+
+async def apply_decision(s, task: PlanTask, decision: CoachDecision) -> tuple[List[dict], List[str]]:
+    out_actions: List[dict] = []
+    tips: List[str] = []
+    for act in decision.actions:
+        if act.type == "add_task" and act.title:
+            due = date.today() + timedelta(days=act.due_in_days or 2)
+            # append at end
+            last_index = (await s.exec(
+                select(PlanTask.order_index)
+                .where(PlanTask.plan_id == task.plan_id)
+                .order_by(PlanTask.order_index.desc())
+            )).first() or 0
+            new_t = PlanTask(
+                plan_id=task.plan_id,
+                order_index=last_index + 1,
+                title=act.title,
+                type="practice",
+                est_minutes=act.est_minutes or 20,
+                due_date=due,
+                resource_ref=act.resource_ref,
+            )
+            s.add(new_t)
+            await s.flush()
+            out_actions.append({"type": "add_task", "task_id": new_t.id, "title": act.title})
+
+        elif act.type == "reschedule_task" and act.target_task_id and act.push_days:
+            tgt = await s.get(PlanTask, act.target_task_id)
+            if tgt and tgt.plan_id == task.plan_id:
+                tgt.due_date = (tgt.due_date or date.today()) + timedelta(days=act.push_days)
+                out_actions.append({"type": "reschedule_task", "task_id": tgt.id, "new_due": tgt.due_date.isoformat()})
+
+        elif act.type == "tip" and act.tip:
+            tips.append(act.tip)
+
+    added = sum(a["type"] == "add_task" for a in out_actions)
+    if added:
+        await s.exec(progress.tasks_added({task.plan_id: added}))  # also bumps the plan version
+    elif out_actions:
+        await s.exec(progress.plan_changed(task.plan_id))
+    return out_actions, tips
+
+async def _claim():
+    async with async_session() as s:
+        job = (await s.exec(CLAIM, params={"lease": COACH_JOB_LEASE})).first()
+        await s.commit()
+    return job
+
+async def _process(job) -> None:
+    payload = job.payload or {}
+    async with async_session() as s:
+        task = await s.get(PlanTask, job.task_id)
+        if not task:
+            raise LookupError("task no longer exists")
+        # recent short history for context, as of the progress write that queued this job
+        q = (
+            select(TaskProgress.outcome)
+            .join(PlanTask, PlanTask.id == TaskProgress.task_id)
+            .where(PlanTask.plan_id == task.plan_id)
+        )
+        if payload.get("progress_id"):
+            q = q.where(TaskProgress.id <= payload["progress_id"])
+        recent = (await s.exec(q.order_by(TaskProgress.id.desc()).limit(5))).all()
+
+    # no connection is held while the coach LLM and link checks run
+    decision = await coach_decide(
+        task_title=task.title,
+        task_type=task.type,
+        est_minutes=task.est_minutes,
+        due_date=str(task.due_date),
+        reflection=payload.get("reflection") or {},
+        recent_outcomes=list(recent)[::-1],
+    )
+
+    async with async_session() as s:
+        # still ours? if the lease expired and another worker re-claimed it, drop this result
+        owned = (await s.exec(
+            select(CoachJob)
+            .where(CoachJob.id == job.id, CoachJob.status == "running", CoachJob.attempts == job.attempts)
+            .with_for_update()
+        )).first()
+        if not owned:
+            return
+        actions, tips = await apply_decision(s, task, decision)
+        owned.status = "done"
+        owned.result = {"actions": actions, "tips": tips}
+        owned.error = None
+        owned.locked_until = None
+        owned.updated_at = datetime.now()
+        await s.commit()
+
+async def _finish_failed(job, err: Exception) -> None:
+    final = job.attempts >= COACH_JOB_MAX_ATTEMPTS
+    async with async_session() as s:
+        await s.exec(text("""
+            UPDATE coachjob
+            SET status = :status, error = :error, updated_at = LOCALTIMESTAMP,
+                locked_until = CASE WHEN :final THEN NULL
+                                    ELSE LOCALTIMESTAMP + make_interval(secs => :backoff) END
+            WHERE id = :id AND status = 'running' AND attempts = :attempts
+        """), params={
+            "status": "failed" if final else "queued", "error": str(err)[:500], "final": final,
+            "backoff": 5 * 2 ** job.attempts, "id": job.id, "attempts": job.attempts,
+        })
+        await s.commit()
+
+async def _release(job) -> None:
+    # shutdown mid-job: hand it back without spending an attempt
+    async with async_session() as s:
+        await s.exec(text("""
+            UPDATE coachjob SET status = 'queued', attempts = attempts - 1, locked_until = NULL
+            WHERE id = :id AND status = 'running' AND attempts = :attempts
+        """), params={"id": job.id, "attempts": job.attempts})
+        await s.commit()
+
+async def _run(job) -> None:
+    try:
+        if job.attempts > COACH_JOB_MAX_ATTEMPTS:
+            # lease kept expiring (worker killed mid-job each time)
+            raise RuntimeError("lease expired too many times")
+        await _process(job)
+    except asyncio.CancelledError:
+        await asyncio.shield(_release(job))
+        raise
+    except Exception as e:
+        print(f"coach job {job.id} attempt {job.attempts} failed: {e}")
+        await _finish_failed(job, e)
+    finally:
+        _notify(job.id)
+
+async def _worker(n: int) -> None:
+    while True:
+        _wake.clear()
+        try:
+            job = await _claim()
+        except Exception as e:
+            print(f"coach worker {n}: claim failed: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(_wake.wait(), COACH_JOB_POLL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        _notify(job.id)
+        try:
+            await _run(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"coach worker {n}: job {job.id} bookkeeping failed: {e}")
+
+def start_workers() -> None:
+    for n in range(COACH_WORKERS):
+        _workers.append(asyncio.create_task(_worker(n)))
+
+async def stop_workers() -> None:
+    for t in _workers:
+        t.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
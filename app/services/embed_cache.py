@@ -0,0 +1,104 @@
+# app/services/embed_cache.py
+import hashlib, re, unicodedata
+from array import array
+from collections import OrderedDict
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import select
+from app.core.config import EMBED_CACHE_SIZE, EMBED_CACHE_PERSIST
+from app.db.session import async_session
+from app.db.models import EmbeddingCache
+
+# (model, text_hash) -> float32 array; arrays keep an entry at ~3 KB instead of ~25 KB for a list
+_lru: "OrderedDict[tuple[str, str], array]" = OrderedDict()
+
+_stats = {
+    "memory_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "embedded_texts": 0,     # texts actually sent to Ollama
+    "ollama_seconds": 0.0,   # wall time spent waiting on those requests
+}
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+def _lru_get(key: tuple[str, str]) -> list[float] | None:
+    vec = _lru.get(key)
+    if vec is None:
+        return None
+    _lru.move_to_end(key)
+    return vec.tolist()
+
+def _lru_put(key: tuple[str, str], vec: list[float]) -> None:
+    if EMBED_CACHE_SIZE <= 0:
+        return
+    _lru[key] = array("f", vec)
+    _lru.move_to_end(key)
+    while len(_lru) > EMBED_CACHE_SIZE:
+        _lru.popitem(last=False)
+
+async def _db_get(model: str, hashes: list[str]) -> dict[str, list[float]]:
+    async with async_session() as s:
+        rows = (await s.exec(
+            select(EmbeddingCache.text_hash, EmbeddingCache.embedding)
+            .where(EmbeddingCache.model == model, EmbeddingCache.text_hash.in_(hashes))
+        )).all()
+    return {h: list(v) for h, v in rows}
+
+async def _db_put(model: str, items: dict[str, list[float]]) -> None:
+    rows = [{"model": model, "text_hash": h, "embedding": v} for h, v in items.items()]
+    async with async_session() as s:
+        await s.exec(pg_insert(EmbeddingCache).values(rows).on_conflict_do_nothing())
+        await s.commit()
+
+async def get_many(model: str, texts: list[str]) -> list[list[float] | None]:
+    """Cached vectors for `texts` (None where missing): LRU first, then one Postgres lookup."""
+    hashes = [text_hash(t) for t in texts]
+    out: list[list[float] | None] = [_lru_get((model, h)) for h in hashes]
+    _stats["memory_hits"] += sum(v is not None for v in out)
+
+    missing = [i for i, v in enumerate(out) if v is None]
+    if missing and EMBED_CACHE_PERSIST:
+        try:
+            found = await _db_get(model, list({hashes[i] for i in missing}))
+        except Exception as e:
+            print(f"embedding cache lookup failed: {e}")
+            found = {}
+        for i in missing:
+            vec = found.get(hashes[i])
+            if vec is not None:
+                out[i] = vec
+                _lru_put((model, hashes[i]), vec)
+                _stats["db_hits"] += 1
+
+    _stats["misses"] += sum(v is None for v in out)
+    return out
+
+async def put_many(model: str, texts: list[str], vecs: list[list[float]]) -> None:
+    items = {text_hash(t): v for t, v in zip(texts, vecs)}
+    for h, v in items.items():
+        _lru_put((model, h), v)
+    if items and EMBED_CACHE_PERSIST:
+        try:
+            await _db_put(model, items)
+        except Exception as e:
+            print(f"embedding cache store failed: {e}")
+
+def record_embed(n_texts: int, seconds: float) -> None:
+    _stats["embedded_texts"] += n_texts
+    _stats["ollama_seconds"] += seconds
+
+def stats() -> dict:
+    hits = _stats["memory_hits"] + _stats["db_hits"]
+    lookups = hits + _stats["misses"]
+    per_text = _stats["ollama_seconds"] / _stats["embedded_texts"] if _stats["embedded_texts"] else 0.0
+    return {
+        **_stats,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "lru_entries": len(_lru),
+        # rough: hits x average Ollama time per embedded text
+        "est_seconds_saved": hits * per_text,
+    }
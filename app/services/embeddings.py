@@ -1,27 +1,54 @@
+import asyncio, time
 import httpx
-from app.core.config import OLLAMA_HOST
+from app.core.config import EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_CONCURRENCY, EMBED_MAX_RETRIES
+from app.services.http_clients import ollama_http
+from app.services import embed_cache
+from app.core import metrics
 
-EMBED_MODEL = "nomic-embed-text"
-EMBED_DIM = 768
+EMBED_DIM = 768   # chunk.embedding is vector(768); EMBED_MODEL must produce this size
 
 async def _post_embed(payload: dict) -> list[float]:
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.post(f"{OLLAMA_HOST}/api/embeddings", json=payload)
-        r.raise_for_status()
-        data = r.json()
-        # Ollama may return {"embedding":[...]} OR {"data":[{"embedding":[...]}]}
-        if isinstance(data, dict):
-            if "embedding" in data and isinstance(data["embedding"], list):
-                return data["embedding"]
-            if "data" in data and data["data"] and "embedding" in data["data"][0]:
-                return data["data"][0]["embedding"]
-        raise ValueError(f"Unexpected embeddings response: {data}")
+    t0 = time.perf_counter()
+    r = await ollama_http().post("/api/embeddings", json=payload)
+    if r.is_error:
+        metrics.OLLAMA_ERRORS.inc(endpoint="embeddings")
+    r.raise_for_status()
+    data = r.json()
+    metrics.record_ollama("embeddings", EMBED_MODEL, time.perf_counter() - t0, data)
+    metrics.EMBED_BATCH_SIZE.observe(1)
+    # Ollama may return {"embedding":[...]} OR {"data":[{"embedding":[...]}]}
+    if isinstance(data, dict):
+        if "embedding" in data and isinstance(data["embedding"], list):
+            return data["embedding"]
+        if "data" in data and data["data"] and "embedding" in data["data"][0]:
+            return data["data"][0]["embedding"]
+    raise ValueError(f"Unexpected embeddings response: {data}")
 
-async def embed_text(text: str) -> list[float]:
-    txt = (text or "").strip()
-    if not txt:
-        raise ValueError("Cannot embed empty text")
+async def _post_embed_batch(texts: list[str]) -> list[list[float]]:
+    # /api/embed takes a list input and returns {"embeddings": [[...], ...]} in input order
+    t0 = time.perf_counter()
+    r = await ollama_http().post("/api/embed", json={"model": EMBED_MODEL, "input": texts})
+    if r.is_error:
+        metrics.OLLAMA_ERRORS.inc(endpoint="embed")
+    r.raise_for_status()
+    data = r.json()
+    metrics.record_ollama("embed", EMBED_MODEL, time.perf_counter() - t0, data)
+    metrics.EMBED_BATCH_SIZE.observe(len(texts))
+    vecs = data.get("embeddings") if isinstance(data, dict) else None
+    if not isinstance(vecs, list) or len(vecs) != len(texts):
+        raise ValueError(f"Unexpected batch embeddings response for {len(texts)} inputs")
+    return vecs
+
+def _check_vec(vec) -> list[float]:
+    if not isinstance(vec, list) or not vec:
+        raise ValueError("Embedding vector is empty")
+
+    # enforce expected dimensionality
+    if len(vec) != EMBED_DIM:
+        raise ValueError(f"Embedding dim mismatch: expected {EMBED_DIM}, got {len(vec)}")
+    return vec
 
+async def _embed_one(txt: str) -> list[float]:
     # Try both payload shapes for cross-compatibility:
     # Some Ollama builds expect "prompt"
     try:
@@ -30,10 +57,77 @@ async def embed_text(text: str) -> list[float]:
         # Some accept "input" (OpenAI-like)
         vec = await _post_embed({"model": EMBED_MODEL, "input": txt})
 
-    if not isinstance(vec, list) or not vec:
-        raise ValueError("Embedding vector is empty")
+    return _check_vec(vec)
 
-    # enforce expected dimensionality
-    if len(vec) != EMBED_DIM:
-        raise ValueError(f"Embedding dim mismatch: expected {EMBED_DIM}, got {len(vec)}")
-    return vec
\ No newline at end of file
+async def _embed_batch(batch: list[str]) -> list[list[float]]:
+    last_err: Exception | None = None
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            return [_check_vec(v) for v in await _post_embed_batch(batch)]
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                # older Ollama without /api/embed: one request per text
+                return [await _embed_one(t) for t in batch]
+            if e.response.status_code < 500:
+                raise
+            last_err = e
+        except (httpx.TransportError, ValueError) as e:
+            last_err = e
+        if attempt < EMBED_MAX_RETRIES:
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    raise last_err if last_err else RuntimeError("Embedding batch failed")
+
+async def _embed_many(txts: list[str]) -> list[list[float]]:
+    batches = [txts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(txts), EMBED_BATCH_SIZE)]
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def _run(batch: list[str]) -> list[list[float]]:
+        async with sem:
+            return await _embed_batch(batch)
+
+    results = await asyncio.gather(*(_run(b) for b in batches))
+    return [vec for batch in results for vec in batch]
+
+async def embed_text(text: str) -> list[float]:
+    txt = (text or "").strip()
+    if not txt:
+        raise ValueError("Cannot embed empty text")
+
+    cached = (await embed_cache.get_many(EMBED_MODEL, [txt]))[0]
+    if cached is not None:
+        return cached
+
+    t0 = time.perf_counter()
+    vec = await _embed_one(txt)
+    embed_cache.record_embed(1, time.perf_counter() - t0)
+    await embed_cache.put_many(EMBED_MODEL, [txt], [vec])
+    return vec
+
+async def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed many texts with EMBED_BATCH_SIZE inputs per request and at most
+    EMBED_CONCURRENCY requests in flight. Cached texts are not re-sent, and
+    vectors come back in input order."""
+    txts = [(t or "").strip() for t in texts]
+    if any(not t for t in txts):
+        raise ValueError("Cannot embed empty text")
+    if not txts:
+        return []
+
+    out = await embed_cache.get_many(EMBED_MODEL, txts)
+    missing = [i for i, v in enumerate(out) if v is None]
+    if missing:
+        # identical (normalized) texts are embedded once
+        uniq: dict[str, str] = {}
+        for i in missing:
+            uniq.setdefault(embed_cache.text_hash(txts[i]), txts[i])
+        todo = list(uniq.values())
+
+        t0 = time.perf_counter()
+        vecs = await _embed_many(todo)
+        embed_cache.record_embed(len(todo), time.perf_counter() - t0)
+        await embed_cache.put_many(EMBED_MODEL, todo, vecs)
+
+        by_hash = dict(zip(uniq.keys(), vecs))
+        for i in missing:
+            out[i] = by_hash[embed_cache.text_hash(txts[i])]
+    return out
@@ -0,0 +1,62 @@
+# app/services/http_clients.py
+import httpx
+from app.core.config import (
+    OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_CONNECT_TIMEOUT, OLLAMA_MAX_CONNECTIONS, OLLAMA_MAX_KEEPALIVE,
+    URL_CHECK_TIMEOUT, URL_CHECK_MAX_CONNECTIONS, URL_CHECK_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY,
+)
+
+USER_AGENT = "AgenticTutor/1.0 (+https://example.com)"
+
+# one pooled client per upstream; opened/closed by the app lifespan
+_ollama: httpx.AsyncClient | None = None
+_web: httpx.AsyncClient | None = None
+
+def _new_ollama() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=OLLAMA_HOST,
+        timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+def _new_web() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=URL_CHECK_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(
+            max_connections=URL_CHECK_MAX_CONNECTIONS,
+            max_keepalive_connections=URL_CHECK_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+async def open_clients() -> None:
+    global _ollama, _web
+    if _ollama is None:
+        _ollama = _new_ollama()
+    if _web is None:
+        _web = _new_web()
+
+async def close_clients() -> None:
+    global _ollama, _web
+    for c in (_ollama, _web):
+        if c is not None:
+            await c.aclose()
+    _ollama = _web = None
+
+def ollama_http() -> httpx.AsyncClient:
+    # created lazily too, so scripts that call the services without the app still work
+    global _ollama
+    if _ollama is None:
+        _ollama = _new_ollama()
+    return _ollama
+
+def web_http() -> httpx.AsyncClient:
+    global _web
+    if _web is None:
+        _web = _new_web()
+    return _web
@@ -0,0 +1,429 @@
+# app/services/local_index.py
+"""
+Optional in-process vector index, used for vector-mode /rag/search when
+VECTOR_BACKEND=local (requires numpy; without it the app stays on pgvector).
+
+Unit-normalized chunk embeddings live in a memory-mapped float32/float16 matrix
+under LOCAL_INDEX_DIR, next to arrays of chunk ids and document ids. At startup
+the files are brought in line with `chunk` (only rows missing from the index are
+read from Postgres), the ingest endpoints add/remove rows as they commit, and a
+background id sync picks up writes made by other processes.
+
+Top-k is a matrix-vector product over all rows, or, from LOCAL_INDEX_IVF_MIN rows
+on, over the rows of the LOCAL_INDEX_PROBES nearest lists of a k-means coarse
+quantizer. Only unfiltered and document_ids-filtered searches are served here;
+Postgres still supplies the hit text and handles every other mode and filter.
+"""
+import asyncio, json, os, threading
+from typing import Iterable, Optional, Sequence
+from sqlmodel import select
+from app.core.config import (
+    EMBED_MODEL, VECTOR_BACKEND, LOCAL_INDEX_DIR, LOCAL_INDEX_DTYPE, LOCAL_INDEX_IVF_MIN, LOCAL_INDEX_PROBES,
+    LOCAL_INDEX_SYNC_INTERVAL,
+)
+from app.db.models import Chunk
+from app.db.session import async_session
+from app.services.embeddings import EMBED_DIM
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: the one-process rule is then up to the deployment
+    fcntl = None
+
+_BLOCK = 16384   # rows scored per matmul; bounds temporaries and lets float16 be widened blockwise
+
+class IndexLocked(RuntimeError):
+    """Another process has the index directory open."""
+
+class LocalIndex:
+    """
+    Rows are append-only; a removed row keeps its slot with chunk id -1 until
+    maintain() compacts the files. path=None keeps everything in memory (benchmarks).
+    A directory belongs to one process at a time (exclusive flock, IndexLocked otherwise).
+    """
+
+    def __init__(self, path: Optional[str], dim: int, dtype: str = "float32", model: str = ""):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unknown LOCAL_INDEX_DTYPE: {dtype}")
+        self.path, self.dim, self.dtype, self.model = path, dim, np.dtype(dtype), model
+        self.n = 0          # rows in use, removed ones included
+        self.dead = 0
+        self._lock = threading.RLock()
+        self._row: dict[int, int] = {}          # chunk id -> row
+        self._by_doc: dict[int, set[int]] = {}  # document id -> rows
+        # coarse quantizer (None until trained)
+        self._centroids = None
+        self._lists: list[list[int]] = []
+        self._list_arrays: dict[int, "np.ndarray"] = {}
+        self._trained_rows = 0
+        self._lock_file = None
+        self._open()
+
+    #=======storage=======
+    def _files(self) -> tuple[str, str, str]:
+        return (os.path.join(self.path, "vectors.bin"), os.path.join(self.path, "ids.bin"),
+                os.path.join(self.path, "meta.json"))
+
+    def _open(self) -> None:
+        if self.path is None:
+            self._alloc(1024)
+            return
+        os.makedirs(self.path, exist_ok=True)
+        self._acquire()
+        vec_f, ids_f, meta_f = self._files()
+        meta = {}
+        if os.path.exists(meta_f):
+            with open(meta_f) as f:
+                meta = json.load(f)
+        if meta.get("dim") != self.dim or meta.get("dtype") != self.dtype.name or meta.get("model") != self.model:
+            # new index, or one built for another model/shape: start over, sync() refills it
+            for p in (vec_f, ids_f):
+                with open(p, "wb"):
+                    pass
+            meta = {"n": 0}
+        self._map(max(1024, os.path.getsize(ids_f) // 16))
+        self.n = min(meta.get("n", 0), len(self.ids))
+        self._rebuild_maps()
+
+    def _acquire(self) -> None:
+        # each process appends at its own self.n, so two writers would overwrite each other's rows
+        if fcntl is None:
+            return
+        f = open(os.path.join(self.path, "lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            raise IndexLocked(f"{self.path} is in use by another process")
+        self._lock_file = f
+
+    def close(self) -> None:
+        self.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()   # releases the flock
+            self._lock_file = None
+
+    def _rebuild_maps(self) -> None:
+        ids = np.asarray(self.ids[:self.n])
+        rows = np.flatnonzero(ids[:, 0] >= 0)
+        self.dead = self.n - len(rows)
+        self._row, self._by_doc = dict(zip(ids[rows, 0].tolist(), rows.tolist())), {}
+        for row, doc in zip(rows.tolist(), ids[rows, 1].tolist()):
+            self._by_doc.setdefault(doc, set()).add(row)
+
+    def _alloc(self, cap: int) -> None:
+        vecs = np.zeros((cap, self.dim), dtype=self.dtype)
+        ids = np.full((cap, 2), -1, dtype=np.int64)
+        if self.n:
+            vecs[:self.n], ids[:self.n] = self.vecs[:self.n], self.ids[:self.n]
+        self.vecs, self.ids = vecs, ids
+
+    def _map(self, cap: int) -> None:
+        vec_f, ids_f, _ = self._files()
+        for p, row_bytes in ((vec_f, self.dim * self.dtype.itemsize), (ids_f, 16)):
+            with open(p, "r+b") as f:
+                f.truncate(cap * row_bytes)   # grows with zeros; existing rows are untouched
+        self.vecs = np.memmap(vec_f, dtype=self.dtype, mode="r+", shape=(cap, self.dim))
+        self.ids = np.memmap(ids_f, dtype=np.int64, mode="r+", shape=(cap, 2))
+
+    def _reserve(self, extra: int) -> None:
+        cap = len(self.ids)
+        if self.n + extra <= cap:
+            return
+        cap = max(cap * 2, self.n + extra)
+        if self.path is None:
+            self._alloc(cap)
+        else:
+            self.flush()
+            self._map(cap)
+            self.ids[self.n:] = -1
+
+    def flush(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            self.vecs.flush()
+            self.ids.flush()
+            _, _, meta_f = self._files()
+            tmp = meta_f + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"n": self.n, "dim": self.dim, "dtype": self.dtype.name, "model": self.model}, f)
+            os.replace(tmp, meta_f)
+
+    #=======updates=======
+    def __len__(self) -> int:
+        return len(self._row)
+
+    def has(self, chunk_id: int) -> bool:
+        return chunk_id in self._row
+
+    def chunk_ids(self) -> "np.ndarray":
+        with self._lock:
+            return np.fromiter(self._row.keys(), dtype=np.int64, count=len(self._row))
+
+    def document_chunks(self, document_id: int) -> list[int]:
+        with self._lock:
+            return [int(self.ids[r, 0]) for r in self._by_doc.get(document_id, ())]
+
+    def add(self, chunk_ids: Sequence[int], document_ids: Sequence[int], vectors) -> None:
+        vecs = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        vecs = vecs / np.where(norms > 0, norms, 1)
+        with self._lock:
+            keep = [i for i, cid in enumerate(chunk_ids) if cid not in self._row]
+            if not keep:
+                return
+            self._reserve(len(keep))
+            start = self.n
+            rows = range(start, start + len(keep))
+            self.vecs[start:start + len(keep)] = vecs[keep]
+            self.ids[start:start + len(keep), 0] = [chunk_ids[i] for i in keep]
+            self.ids[start:start + len(keep), 1] = [document_ids[i] for i in keep]
+            self.n += len(keep)
+            for row, i in zip(rows, keep):
+                self._row[chunk_ids[i]] = row
+                self._by_doc.setdefault(document_ids[i], set()).add(row)
+            if self._centroids is not None:
+                self._assign_rows(np.arange(start, self.n))
+
+    def remove(self, chunk_ids: Iterable[int]) -> None:
+        with self._lock:
+            for cid in chunk_ids:
+                row = self._row.pop(cid, None)
+                if row is None:
+                    continue
+                doc = int(self.ids[row, 1])
+                rows = self._by_doc.get(doc)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self._by_doc[doc]
+                self.ids[row, 0] = -1
+                self.dead += 1
+
+    def maintain(self, ivf_min: int = LOCAL_INDEX_IVF_MIN) -> None:
+        """Compact once a quarter of the rows are removed; (re)train the quantizer when due."""
+        with self._lock:
+            if self.dead and self.dead * 4 >= self.n:
+                self._compact()
+            live = len(self._row)
+            if live < ivf_min:
+                self._drop_quantizer()
+            elif self._centroids is None or live > 2 * self._trained_rows or live * 2 < self._trained_rows:
+                self.train()
+
+    def _compact(self) -> None:
+        alive = np.flatnonzero(self.ids[:self.n, 0] >= 0)
+        # alive[j] >= j, so block-wise forward copies never overwrite rows still to be read
+        for start in range(0, len(alive), _BLOCK):
+            idx = alive[start:start + _BLOCK]
+            self.vecs[start:start + len(idx)] = self.vecs[idx]
+            self.ids[start:start + len(idx)] = self.ids[idx]
+        self.n = len(alive)
+        self.ids[self.n:] = -1
+        self._rebuild_maps()
+        self._drop_quantizer()
+        self.flush()
+
+    #=======coarse quantizer=======
+    def _drop_quantizer(self) -> None:
+        self._centroids, self._lists, self._list_arrays, self._trained_rows = None, [], {}, 0
+
+    def train(self, lists: int = 0, iters: int = 10, seed: int = 0) -> None:
+        """Spherical k-means on a sample of live rows; lists defaults to sqrt(rows)."""
+        with self._lock:
+            alive = np.flatnonzero(self.ids[:self.n, 0] >= 0)
+            if not len(alive):
+                self._drop_quantizer()
+                return
+            k = max(1, min(lists or int(np.sqrt(len(alive))), len(alive)))
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(alive, size=min(len(alive), 64 * k), replace=False))
+            x = np.asarray(self.vecs[sample], dtype=np.float32)
+            cent = x[rng.choice(len(x), size=k, replace=False)].copy()
+            for _ in range(iters):
+                a = np.argmax(x @ cent.T, axis=1)
+                sums = np.zeros_like(cent)
+                np.add.at(sums, a, x)
+                empty = ~np.bincount(a, minlength=k).astype(bool)
+                sums[empty] = cent[empty]
+                cent = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+            self._centroids = cent
+            self._lists, self._list_arrays = [[] for _ in range(k)], {}
+            self._assign_rows(alive)
+            self._trained_rows = len(alive)
+
+    def _assign_rows(self, rows: "np.ndarray") -> None:
+        for start in range(0, len(rows), _BLOCK):
+            part = rows[start:start + _BLOCK]
+            a = np.argmax(np.asarray(self.vecs[part], dtype=np.float32) @ self._centroids.T, axis=1)
+            for row, lst in zip(part.tolist(), a.tolist()):
+                self._lists[lst].append(row)
+                self._list_arrays.pop(lst, None)
+
+    def _list_rows(self, lst: int) -> "np.ndarray":
+        arr = self._list_arrays.get(lst)
+        if arr is None:
+            arr = self._list_arrays[lst] = np.asarray(self._lists[lst], dtype=np.int64)
+        return arr
+
+    #=======search=======
+    def _scores(self, q: "np.ndarray", rows: Optional["np.ndarray"]) -> "np.ndarray":
+        total = self.n if rows is None else len(rows)
+        out = np.empty(total, dtype=np.float32)
+        for start in range(0, total, _BLOCK):
+            end = min(start + _BLOCK, total)
+            block = self.vecs[start:end] if rows is None else self.vecs[rows[start:end]]
+            out[start:end] = np.asarray(block, dtype=np.float32) @ q
+        return out
+
+    def search(self, qvec, k: int, document_ids: Optional[Sequence[int]] = None,
+               probes: int = LOCAL_INDEX_PROBES, exact: bool = False) -> list[tuple[int, float]]:
+        """(chunk id, cosine distance) of the k nearest live rows, closest first."""
+        q = np.asarray(qvec, dtype=np.float32).reshape(self.dim)
+        q = q / (np.linalg.norm(q) or 1.0)
+        with self._lock:
+            if document_ids is not None:
+                # a document filter is usually selective: scan exactly the rows it allows
+                rows = np.fromiter(sorted(r for d in set(document_ids) for r in self._by_doc.get(d, ())),
+                                   dtype=np.int64)
+            elif self._centroids is not None and not exact:
+                nearest = np.argsort(-(self._centroids @ q))[:max(1, probes)]
+                rows = np.concatenate([self._list_rows(int(c)) for c in nearest])
+            else:
+                rows = None
+            if rows is not None and not len(rows):
+                return []
+            scores = self._scores(q, rows)
+            cids = self.ids[:self.n, 0] if rows is None else self.ids[rows, 0]
+            scores[cids < 0] = -np.inf
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(int(cids[i]), float(1.0 - scores[i])) for i in top if scores[i] != -np.inf]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rows": len(self._row),
+                "removed_slots": self.dead,
+                "dtype": self.dtype.name,
+                "bytes": int(self.n * self.dim * self.dtype.itemsize),
+                "lists": len(self._lists) if self._centroids is not None else 0,
+                "path": self.path,
+            }
+
+#=======app integration=======
+_index: Optional[LocalIndex] = None
+_sync_lock: Optional[asyncio.Lock] = None
+_sync_task: Optional[asyncio.Task] = None
+_FETCH_BATCH = 2000
+
+def enabled() -> bool:
+    return _index is not None
+
+async def open_index() -> None:
+    """Called from the app lifespan, after init_db."""
+    global _index, _sync_lock, _sync_task
+    if VECTOR_BACKEND != "local":
+        return
+    if np is None:
+        print("VECTOR_BACKEND=local needs numpy (pip install numpy); vector search stays on pgvector.")
+        return
+    try:
+        _index = await asyncio.to_thread(LocalIndex, LOCAL_INDEX_DIR, EMBED_DIM, LOCAL_INDEX_DTYPE, EMBED_MODEL)
+    except IndexLocked as e:
+        print(f"Local vector index: {e}; vector search stays on pgvector in this process.")
+        return
+    _sync_lock = asyncio.Lock()
+    await sync()
+    if LOCAL_INDEX_SYNC_INTERVAL > 0:
+        _sync_task = asyncio.create_task(_sync_loop())
+    s = await asyncio.to_thread(_index.stats)
+    scan = f"{s['lists']} lists" if s["lists"] else "exact scan"
+    print(f"Local vector index: {s['rows']} rows, {s['dtype']}, {scan}, at {s['path']}.")
+
+async def close_index() -> None:
+    global _index, _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        await asyncio.gather(_sync_task, return_exceptions=True)
+        _sync_task = None
+    if _index is not None:
+        await asyncio.to_thread(_index.close)
+        _index = None
+
+async def _load(ids: list[int]) -> None:
+    for start in range(0, len(ids), _FETCH_BATCH):
+        async with async_session() as s:
+            rows = (await s.exec(
+                select(Chunk.id, Chunk.document_id, Chunk.embedding)
+                .where(Chunk.id.in_(ids[start:start + _FETCH_BATCH]))
+            )).all()
+        if rows:
+            await asyncio.to_thread(_index.add, [r[0] for r in rows], [r[1] for r in rows],
+                                    [np.asarray(r[2], dtype=np.float32) for r in rows])
+
+async def sync() -> None:
+    """Make the index hold exactly the chunk ids in Postgres; embeddings are read only for missing ones."""
+    if _index is None:
+        return
+    async with _sync_lock:
+        # index snapshot first: rows a concurrent sync_document() adds after it are either in db_ids
+        # (and skipped by add) or not in `have`, so they can never be taken for deleted ones
+        have = await asyncio.to_thread(_index.chunk_ids)
+        async with async_session() as s:
+            db_ids = np.fromiter((await s.exec(select(Chunk.id))).all(), dtype=np.int64)
+        await asyncio.to_thread(_index.remove, np.setdiff1d(have, db_ids, assume_unique=True).tolist())
+        await _load(np.setdiff1d(db_ids, have, assume_unique=True).tolist())
+        await asyncio.to_thread(_index.maintain)
+        await asyncio.to_thread(_index.flush)
+
+async def _sync_loop() -> None:
+    # picks up writes by other processes (and compacts/retrains) off the request path
+    while True:
+        await asyncio.sleep(LOCAL_INDEX_SYNC_INTERVAL)
+        try:
+            await sync()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"local index sync failed: {e}")
+
+def _prune_document(document_id: int, rows: list[tuple[int, str]]) -> list[tuple[int, str]]:
+    # drop the document's rows that are gone from `chunk`; returns the (id, hash) rows not indexed yet
+    present = {cid for cid, _ in rows}
+    _index.remove([cid for cid in _index.document_chunks(document_id) if cid not in present])
+    return [(cid, h) for cid, h in rows if not _index.has(cid)]
+
+async def sync_document(document_id: int, vectors: dict[str, list[float]]) -> None:
+    """
+    After a commit touching one document: drop rows for its deleted chunks and add
+    its new ones, using `vectors` (content_hash -> embedding) where the caller has them.
+    """
+    if _index is None:
+        return
+    async with async_session() as s:
+        rows = (await s.exec(
+            select(Chunk.id, Chunk.content_hash).where(Chunk.document_id == document_id)
+        )).all()
+    new = await asyncio.to_thread(_prune_document, document_id, rows)
+    known = [(cid, vectors[h]) for cid, h in new if h in vectors]
+    if known:
+        await asyncio.to_thread(_index.add, [c for c, _ in known], [document_id] * len(known), [v for _, v in known])
+    await _load([cid for cid, h in new if h not in vectors])
+
+async def drop_document(document_id: int) -> None:
+    if _index is not None:
+        await asyncio.to_thread(_prune_document, document_id, [])
+
+async def search(qvec: list[float], k: int, document_ids: Optional[Sequence[int]] = None) -> list[tuple[int, float]]:
+    return await asyncio.to_thread(_index.search, qvec, k, document_ids)
+
+def stats() -> dict:
+    return _index.stats() if _index is not None else {"backend": VECTOR_BACKEND, "enabled": False}
@@ -1,25 +1,57 @@
 # app/services/ollama_client.py
-import httpx, json
-from app.core.config import OLLAMA_HOST
+import json, time
+from app.services.http_clients import ollama_http
+from app.core import metrics
+
+async def _generate(model: str, payload: dict) -> dict:
+    t0 = time.perf_counter()
+    try:
+        r = await ollama_http().post("/api/generate", json=payload)
+    except Exception:
+        metrics.OLLAMA_ERRORS.inc(endpoint="generate")
+        raise
+    if r.status_code != 200:
+        metrics.OLLAMA_ERRORS.inc(endpoint="generate")
+        raise RuntimeError(f"Ollama error {r.status_code}: {r.text}")
+    data = r.json()
+    metrics.record_ollama("generate", model, time.perf_counter() - t0, data)
+    return data
 
 async def generate_text(model: str, prompt: str, options: dict | None = None) -> str:
     payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": "10m"}
     if options: payload["options"] = options
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.post(f"{OLLAMA_HOST}/api/generate", json=payload)
-        if r.status_code != 200:
-            raise RuntimeError(f"Ollama error {r.status_code}: {r.text}")
-        return r.json()["response"]
+    return (await _generate(model, payload))["response"]
 
 async def generate_json(model: str, prompt: str, options: dict | None = None) -> dict:
     payload = {"model": model, "prompt": prompt, "stream": False, "format": "json", "keep_alive": "10m"}
     if options: payload["options"] = options
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.post(f"{OLLAMA_HOST}/api/generate", json=payload)
+    data = await _generate(model, payload)
+    content = data.get("response")
+    if content is None:
+        raise ValueError("Ollama response missing 'response' field")
+    return json.loads(content) if isinstance(content, str) else content
+
+async def stream_generate(model: str, prompt: str, options: dict | None = None, json_format: bool = False):
+    """Yield response fragments as Ollama produces them (stream: true, NDJSON lines)."""
+    payload = {"model": model, "prompt": prompt, "stream": True, "keep_alive": "10m"}
+    if json_format: payload["format"] = "json"
+    if options: payload["options"] = options
+    t0 = time.perf_counter()
+    async with ollama_http().stream("POST", "/api/generate", json=payload) as r:
         if r.status_code != 200:
+            await r.aread()
+            metrics.OLLAMA_ERRORS.inc(endpoint="generate_stream")
             raise RuntimeError(f"Ollama error {r.status_code}: {r.text}")
-        data = r.json()
-        content = data.get("response")
-        if content is None:
-            raise ValueError("Ollama response missing 'response' field")
-        return json.loads(content) if isinstance(content, str) else content
\ No newline at end of file
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.get("error"):
+                metrics.OLLAMA_ERRORS.inc(endpoint="generate_stream")
+                raise RuntimeError(f"Ollama error: {data['error']}")
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                # the final line carries the token counts
+                metrics.record_ollama("generate_stream", model, time.perf_counter() - t0, data)
+                break
@@ -0,0 +1,65 @@
+# app/services/plan_cache.py
+import asyncio, hashlib, json, re, time
+from collections import OrderedDict
+from datetime import date
+from app.core.config import PLAN_CACHE_TTL, PLAN_CACHE_MAX_ENTRIES
+from app.agents.planner import generate_plan
+from app.schemas.plan import PlanRequest, PlanResponse
+
+# key -> (plan, created_at, expires_at)
+_cache: "OrderedDict[str, tuple[PlanResponse, float, float]]" = OrderedDict()
+# key -> running generation, so concurrent identical requests share one LLM run
+_inflight: dict[str, asyncio.Task] = {}
+
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+def _norm(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip().lower())
+
+def request_key(req: PlanRequest, today: date) -> str:
+    # due dates are relative to the anchor date, so it is part of the key
+    raw = json.dumps([_norm(req.goal), _norm(req.level), req.minutes, _norm(req.deadline), today.isoformat()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+async def _generate_and_cache(key: str, req: PlanRequest) -> PlanResponse:
+    plan = await generate_plan(req)
+    if PLAN_CACHE_TTL > 0:
+        now = time.monotonic()
+        _cache[key] = (plan, now, now + PLAN_CACHE_TTL)
+        _cache.move_to_end(key)
+        while len(_cache) > PLAN_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return plan
+
+async def get_plan(req: PlanRequest, use_cache: bool = True) -> tuple[PlanResponse, str, float | None]:
+    """
+    Returns (plan, status, age_seconds). status is "hit" (served from the TTL cache),
+    "coalesced" (joined an identical generation already running) or "miss".
+    use_cache=False skips the cache lookup but still joins an in-flight run,
+    whose result is fresh anyway.
+    """
+    key = request_key(req, date.today())
+
+    if use_cache:
+        hit = _cache.get(key)
+        if hit and hit[2] > time.monotonic():
+            _stats["hits"] += 1
+            _cache.move_to_end(key)
+            return hit[0].model_copy(deep=True), "hit", time.monotonic() - hit[1]
+
+    task = _inflight.get(key)
+    if task:
+        _stats["coalesced"] += 1
+        status = "coalesced"
+    else:
+        _stats["misses"] += 1
+        status = "miss"
+        task = _inflight[key] = asyncio.create_task(_generate_and_cache(key, req))
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    # shield: one client disconnecting must not cancel the run the others are waiting on
+    plan = await asyncio.shield(task)
+    # callers get their own copy; the cached object is shared
+    return plan.model_copy(deep=True), status, None
+
+def cache_stats() -> dict:
+    return {**_stats, "entries": len(_cache), "inflight": len(_inflight)}
@@ -0,0 +1,164 @@
+# app/services/retrieval.py
+"""SQL for /rag/search: vector, lexical (tsvector) and hybrid (reciprocal-rank fusion), with filters."""
+from datetime import datetime
+from typing import Optional, Sequence
+from sqlalchemy import ARRAY, Float, Integer, Text, bindparam, cast, column, func, literal_column, true
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from pgvector.sqlalchemy import BIT, HALFVEC, VECTOR
+from sqlmodel import select
+from app.core.config import FTS_CONFIG, HYBRID_CANDIDATES, RRF_K
+from app.db.models import Document, Chunk
+from app.db.session import EMBEDDING_DIM, vector_storage, ann_candidates
+from app.utils.tags import normalize_tags
+
+# chunk.tsv is created by app/db/migrations.py and not mapped on the model
+TSV = literal_column("chunk.tsv", type_=TSVECTOR)
+
+def filter_clauses(tags: Optional[Sequence[str]] = None,
+                   document_ids: Optional[Sequence[int]] = None,
+                   created_after: Optional[datetime] = None,
+                   created_before: Optional[datetime] = None) -> list:
+    """
+    WHERE clauses on `chunk` for search filters. Document-level filters become a
+    semi-join on document ids, so they compose with any of the search shapes below.
+    `tags` means the document carries all of them.
+    """
+    where = []
+    if document_ids:
+        where.append(Chunk.document_id.in_(list(document_ids)))
+    doc_where = []
+    if tags:
+        doc_where.append(Document.tag_list.contains(normalize_tags(tags)))
+    if created_after:
+        doc_where.append(Document.created_at >= created_after)
+    if created_before:
+        doc_where.append(Document.created_at < created_before)
+    if doc_where:
+        where.append(Chunk.document_id.in_(select(Document.id).where(*doc_where)))
+    return where
+
+def _tsquery(q: str):
+    return func.websearch_to_tsquery(literal_column(f"'{FTS_CONFIG}'::regconfig"), q)
+
+def _quantized_distance(qvec, storage: str):
+    # must match the index expression in session.STORAGE_INDEX for the planner to use it
+    if storage == "halfvec":
+        return cast(Chunk.embedding, HALFVEC(EMBEDDING_DIM)).cosine_distance(cast(qvec, HALFVEC(EMBEDDING_DIM)))
+    q = func.binary_quantize(cast(qvec, VECTOR(EMBEDDING_DIM)))
+    return cast(func.binary_quantize(Chunk.embedding), BIT(EMBEDDING_DIM)).op("<~>", return_type=Float)(q)
+
+def _nearest_select(qvec, n, where: Sequence = (), prefilter: bool = False, storage: Optional[str] = None):
+    """
+    SELECT (id, d) of the n chunks closest to qvec. qvec/n may also be columns of an
+    outer query (batch search runs this as a LATERAL subquery per query vector).
+    prefilter: rank the filtered rows exactly instead of filtering an ANN scan
+    (for pgvector without iterative scans, where a selective filter can starve the index scan).
+    storage: halfvec/binary take ann_candidates(n) from the quantized index, then re-rank exactly.
+    """
+    storage = storage or vector_storage()
+    if where and prefilter:
+        cand = select(Chunk.id, Chunk.embedding).where(*where).cte("cand").prefix_with("MATERIALIZED")
+    elif storage != "full":
+        # lateral so a qvec column from an enclosing query is correlated rather than re-selected;
+        # chunk never is (the batch query joins its own chunk for the hit rows)
+        cand = (
+            select(Chunk.id, Chunk.embedding).where(*where)
+            .order_by(_quantized_distance(qvec, storage)).limit(ann_candidates(n, storage))
+            .correlate_except(Chunk).lateral("cand")
+        )
+    else:
+        dist = Chunk.embedding.cosine_distance(qvec)
+        return select(Chunk.id, dist.label("d")).where(*where).order_by(dist).limit(n).correlate_except(Chunk)
+    dist = cand.c.embedding.cosine_distance(qvec)
+    return select(cand.c.id, dist.label("d")).order_by(dist).limit(n)
+
+def _nearest(qvec: list[float], n: int, where: Sequence = (), prefilter: bool = False,
+             storage: Optional[str] = None):
+    return _nearest_select(qvec, n, where, prefilter, storage).subquery()
+
+def _hits(score_col):
+    return (
+        select(Chunk.id, Chunk.document_id, Chunk.text, Document.title, score_col.label("score"))
+        .join(Document, Document.id == Chunk.document_id)
+    )
+
+def chunks_by_id(ids: Sequence[int]):
+    # hit rows for ids ranked elsewhere (the local index); score is filled in by the caller
+    return _hits(literal_column("0")).where(Chunk.id.in_(list(ids)))
+
+def vector_search(qvec: list[float], top_k: int, where: Sequence = (), prefilter: bool = False,
+                  storage: Optional[str] = None):
+    # score = cosine distance, lower is closer
+    near = _nearest(qvec, top_k, where, prefilter, storage)
+    return _hits(near.c.d).join(near, near.c.id == Chunk.id).order_by(near.c.d)
+
+def batch_vector_search(qvecs: list[list[float]], top_ks: list[int], where: Sequence = (),
+                        prefilter: bool = False, storage: Optional[str] = None):
+    """
+    Nearest neighbours for many query vectors in one statement: the vectors are unnested
+    into rows (i, v, k) and each row joins a LATERAL top-k. Rows come back ordered by
+    (query index i, distance); score = cosine distance.
+    """
+    q = (
+        func.unnest(
+            bindparam("batch_i", list(range(len(qvecs))), type_=ARRAY(Integer)),
+            # text[] -> vector[]: one array parameter instead of one per query
+            cast(bindparam("batch_v", ["[" + ",".join(map(str, v)) + "]" for v in qvecs], type_=ARRAY(Text)),
+                 ARRAY(VECTOR(EMBEDDING_DIM))),
+            bindparam("batch_k", list(top_ks), type_=ARRAY(Integer)),
+        )
+        .table_valued(column("i", Integer), column("v", VECTOR(EMBEDDING_DIM)), column("k", Integer))
+        .render_derived(name="q")
+    )
+    near = _nearest_select(q.c.v, q.c.k, where, prefilter, storage).lateral("near")
+    return (
+        select(q.c.i, Chunk.id, Chunk.document_id, Chunk.text, Document.title, near.c.d.label("score"))
+        .select_from(q)
+        .join(near, true())
+        .join(Chunk, Chunk.id == near.c.id)
+        .join(Document, Document.id == Chunk.document_id)
+        .order_by(q.c.i, near.c.d)
+    )
+
+def lexical_search(q: str, top_k: int, where: Sequence = ()):
+    # score = ts_rank_cd, higher is better; no embedding needed
+    tsq = _tsquery(q)
+    rank = func.ts_rank_cd(TSV, tsq)
+    return _hits(rank).where(TSV.op("@@")(tsq), *where).order_by(rank.desc(), Chunk.id).limit(top_k)
+
+def hybrid_search(q: str, qvec: list[float], top_k: int, where: Sequence = (), prefilter: bool = False,
+                  candidates: int = HYBRID_CANDIDATES):
+    """
+    One statement: top `candidates` by vector distance and by text rank, each
+    numbered 1..n, fused as sum(1 / (RRF_K + rank)). score = fused value, higher is better.
+    """
+    n = max(candidates, top_k)
+
+    v_in = _nearest(qvec, n, where, prefilter)
+    vec = select(v_in.c.id, func.row_number().over(order_by=v_in.c.d).label("r")).cte("vec")
+
+    tsq = _tsquery(q)
+    rank = func.ts_rank_cd(TSV, tsq)
+    l_in = (
+        select(Chunk.id, rank.label("rank"))
+        .where(TSV.op("@@")(tsq), *where)
+        .order_by(rank.desc())
+        .limit(n)
+        .subquery()
+    )
+    lex = select(l_in.c.id, func.row_number().over(order_by=l_in.c.rank.desc()).label("r")).cte("lex")
+
+    fused = (
+        select(
+            func.coalesce(vec.c.id, lex.c.id).label("id"),
+            (func.coalesce(1.0 / (RRF_K + vec.c.r), 0) + func.coalesce(1.0 / (RRF_K + lex.c.r), 0)).label("score"),
+        )
+        .select_from(vec.join(lex, lex.c.id == vec.c.id, full=True))
+        .cte("fused")
+    )
+    return (
+        _hits(fused.c.score)
+        .join(fused, fused.c.id == Chunk.id)
+        .order_by(fused.c.score.desc(), Chunk.id)
+        .limit(top_k)
+    )
@@ -0,0 +1,18 @@
+import base64, json
+
+# opaque keyset cursors: the sort key of the last row on a page, base64url(JSON)
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, n: int) -> list:
+    """Values from encode_cursor; ValueError if the cursor is malformed or doesn't hold n values."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != n:
+        raise ValueError("invalid cursor")
+    return values
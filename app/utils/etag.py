@@ -0,0 +1,29 @@
+import hashlib
+from fastapi import Request, Response
+
+# ETags for plan reads, derived from planprogress.version (bumped on every plan write)
+# plus whatever else shapes the body (endpoint, query params, today's date). They are weak:
+# GZipMiddleware sends the same tag for the gzip and identity bodies, which a strong tag forbids
+
+def plan_etag(kind: str, plan_id: int, version: int, *extra) -> str:
+    raw = "\x1f".join(str(p) for p in (kind, plan_id, version, *extra))
+    return 'W/"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag.removeprefix("W/") for t in header.split(","))
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # clients may keep the body but must revalidate before reusing it
+    response.headers["Cache-Control"] = "private, no-cache"
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
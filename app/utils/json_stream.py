@@ -0,0 +1,74 @@
+from __future__ import annotations
+import json
+from typing import Any
+
+class ArrayItemParser:
+    """
+    Incremental parser for one JSON object whose interesting members are arrays,
+    e.g. {"milestones": [...], "tasks": [...]}.
+    feed() text fragments as they arrive; it returns (key, element) for every
+    element of a top-level array that completed within the fragment.
+    Elements that are not valid JSON on their own are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str: list[str] = []     # current string at depth 1 (candidate key)
+        self._last_str: str | None = None
+        self._key: str | None = None
+        self._elem: list[str] | None = None
+        self._elem_kind = ""          # "container" | "string" | "scalar"
+
+    def _finish(self, out: list[tuple[str, Any]]) -> None:
+        raw = "".join(self._elem or [])
+        self._elem = None
+        try:
+            out.append((self._key or "", json.loads(raw)))
+        except ValueError:
+            pass
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        out: list[tuple[str, Any]] = []
+        for ch in chunk:
+            if self._elem is not None:
+                if self._elem_kind == "scalar" and not self._in_str and ch in ",]":
+                    self._finish(out)
+                else:
+                    self._elem.append(ch)
+
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        self._last_str = "".join(self._str)
+                    elif self._depth == 2 and self._elem_kind == "string" and self._elem is not None:
+                        self._finish(out)
+                elif self._depth == 1:
+                    self._str.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_str = True
+                if self._depth == 1:
+                    self._str = []
+                elif self._depth == 2 and self._elem is None:
+                    self._elem, self._elem_kind = [ch], "string"
+            elif ch in "{[":
+                if self._depth == 2 and self._elem is None:
+                    self._elem, self._elem_kind = [ch], "container"
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._elem is not None and self._elem_kind == "container":
+                    self._finish(out)
+            elif ch == ":" and self._depth == 1:
+                self._key = self._last_str
+            elif self._depth == 2 and self._elem is None and not ch.isspace() and ch != ",":
+                self._elem, self._elem_kind = [ch], "scalar"
+        return out
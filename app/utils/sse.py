@@ -0,0 +1,5 @@
+import json
+
+def sse(event: str, data) -> str:
+    """One Server-Sent Events message; data is JSON (dates and the like via str)."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,13 @@
+from typing import Iterable, List, Optional, Union
+
+def normalize_tags(tags: Optional[Union[str, Iterable[str]]]) -> List[str]:
+    """'Python, Web Dev,python' -> ['python', 'web dev'] (lowercased, trimmed, de-duplicated, order kept)."""
+    if not tags:
+        return []
+    items = tags.split(",") if isinstance(tags, str) else tags
+    out: List[str] = []
+    for t in items:
+        t = " ".join((t or "").split()).lower()
+        if t and t not in out:
+            out.append(t)
+    return out
@@ -1,11 +1,29 @@
 from __future__ import annotations
-import asyncio, ipaddress
+import asyncio, ipaddress, time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse
-import httpx
+from app.core.config import (
+    URL_CHECK_TIMEOUT, URL_CHECK_CONCURRENCY, URL_CHECK_PER_HOST,
+    URL_CACHE_TTL_OK, URL_CACHE_TTL_BAD, URL_CACHE_MAX_ENTRIES,
+)
+from app.services.http_clients import web_http
+from app.core import metrics
 
 ALLOWED_SCHEMES = {"http", "https"}
-REQUEST_TIMEOUT = 5.0          # seconds
-MAX_CONCURRENCY = 8            # safety so we don't hammer sites
+REQUEST_TIMEOUT = URL_CHECK_TIMEOUT   # seconds, applied by the pooled web client
+MAX_CONCURRENCY = URL_CHECK_CONCURRENCY   # safety so we don't hammer sites
+PER_HOST_CONCURRENCY = URL_CHECK_PER_HOST
+
+# url -> (valid, expires_at); valid and invalid results get separate TTLs
+_cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+# url -> running check, so concurrent callers share one request
+_inflight: dict[str, asyncio.Task] = {}
+_global_sem = asyncio.Semaphore(MAX_CONCURRENCY)
+# host -> (semaphore, checks holding or waiting for one of its slots)
+_host_sems: dict[str, tuple[asyncio.Semaphore, int]] = {}
+
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
 
 def _looks_safe_http_url(url: str) -> bool:
     try:
@@ -28,21 +46,68 @@ def _looks_safe_http_url(url: str) -> bool:
         pass
     return True
 
-async def is_valid_url(url: str) -> bool:
-    if not _looks_safe_http_url(url):
-        return False
+@asynccontextmanager
+async def _host_slot(host: str):
+    # a host's semaphore is dropped once nobody holds or waits on it, never while a slot is taken
+    sem, users = _host_sems.get(host) or (asyncio.Semaphore(PER_HOST_CONCURRENCY), 0)
+    _host_sems[host] = (sem, users + 1)
     try:
-        headers = {"User-Agent": "AgenticTutor/1.0 (+https://example.com)"}
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, follow_redirects=True, headers=headers) as c:
-            # Try HEAD first
-            r = await c.head(url)
-            if r.status_code >= 400:
-                # Some hosts don't implement HEAD well
-                r = await c.get(url)
-            return 200 <= r.status_code < 400
+        async with sem:
+            yield
+    finally:
+        sem, users = _host_sems[host]
+        if users == 1:
+            del _host_sems[host]
+        else:
+            _host_sems[host] = (sem, users - 1)
+
+async def _probe(url: str) -> bool:
+    try:
+        c = web_http()
+        # Try HEAD first
+        r = await c.head(url)
+        if r.status_code >= 400:
+            # Some hosts don't implement HEAD well; stream so we don't download the body
+            async with c.stream("GET", url) as r:
+                return 200 <= r.status_code < 400
+        return 200 <= r.status_code < 400
     except Exception:
         return False
 
+async def _check_and_cache(url: str) -> bool:
+    # host slot first: a burst to one host must not park global slots behind its per-host limit
+    async with _host_slot((urlparse(url).hostname or "").lower()), _global_sem:
+        t0 = time.perf_counter()
+        ok = await _probe(url)
+        metrics.URL_CHECK_LATENCY.observe(time.perf_counter() - t0, result="ok" if ok else "bad")
+    _cache[url] = (ok, time.monotonic() + (URL_CACHE_TTL_OK if ok else URL_CACHE_TTL_BAD))
+    _cache.move_to_end(url)
+    while len(_cache) > URL_CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return ok
+
+async def is_valid_url(url: str) -> bool:
+    if not _looks_safe_http_url(url):
+        return False
+
+    hit = _cache.get(url)
+    if hit and hit[1] > time.monotonic():
+        _stats["hits"] += 1
+        return hit[0]
+
+    task = _inflight.get(url)
+    if task:
+        _stats["coalesced"] += 1
+    else:
+        _stats["misses"] += 1
+        task = _inflight[url] = asyncio.create_task(_check_and_cache(url))
+        task.add_done_callback(lambda _t: _inflight.pop(url, None))
+    # shield: one caller being cancelled must not cancel the check the others are waiting on
+    return await asyncio.shield(task)
+
+def cache_stats() -> dict:
+    return {**_stats, "entries": len(_cache), "inflight": len(_inflight)}
+
 async def scrub_task_links(tasks: list[dict]) -> list[dict]:
     """
     For a list of task dicts (with optional 'resource_ref'), drop any invalid links.
@@ -53,11 +118,9 @@ async def scrub_task_links(tasks: list[dict]) -> list[dict]:
     if not to_check:
         return tasks
 
-    sem = asyncio.Semaphore(MAX_CONCURRENCY)
-
+    # concurrency limits and de-duplication of repeated URLs happen inside is_valid_url
     async def _checked(idx: int, url: str) -> tuple[int, bool]:
-        async with sem:
-            return idx, await is_valid_url(url)
+        return idx, await is_valid_url(url)
 
     results = await asyncio.gather(*(_checked(i, u) for i, u in to_check), return_exceptions=True)
 
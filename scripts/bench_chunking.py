@@ -0,0 +1,96 @@
+"""
+Throughput / output-shape benchmark for app/services/chunking.py.
+
+Generates a multi-MB markdown-ish text (or reads --file) and, for each strategy,
+reports MB/s, chunk count, token stats per chunk and the total tokens that would
+be sent to the embedding model. Chunk count and total tokens drive embedding
+cost and index size. "legacy" is the previous 800-character packer, kept here
+for comparison.
+
+    python -m scripts.bench_chunking --mb 8
+    python -m scripts.bench_chunking --file course.md --max-tokens 256 --overlap 32
+"""
+import argparse, random, re, statistics, time
+from app.services.chunking import split_into_chunks, estimate_tokens, STRATEGIES
+
+WORDS = ("the a of to and in is for on with as by model vector index query token chunk embedding "
+         "learner practice lesson review schedule database latency throughput cache sentence").split()
+
+def synthetic_text(mb: float, seed: int) -> str:
+    r = random.Random(seed)
+    parts: list[str] = []
+    size = 0
+    target = int(mb * 1024 * 1024)
+    while size < target:
+        k = r.random()
+        if k < 0.05:
+            p = "#" * r.randint(1, 3) + " " + " ".join(r.choice(WORDS) for _ in range(r.randint(2, 6))).title()
+        elif k < 0.08:
+            p = "```\n" + "\n".join(f"x{i} = compute({i})" for i in range(r.randint(3, 15))) + "\n```"
+        elif k < 0.12:
+            p = "\n".join("- " + " ".join(r.choice(WORDS) for _ in range(r.randint(3, 12))) for _ in range(r.randint(2, 8)))
+        else:
+            # mostly normal paragraphs, sometimes a very long one (transcripts, scraped pages)
+            n_sent = r.randint(1, 8) if r.random() < 0.9 else r.randint(80, 400)
+            p = " ".join(
+                " ".join(r.choice(WORDS) for _ in range(r.randint(5, 30))).capitalize() + r.choice(".!?")
+                for _ in range(n_sent)
+            )
+        parts.append(p)
+        size += len(p) + 2
+    return "\n\n".join(parts)
+
+def legacy_chunks(text: str, chunk_size: int = 800, overlap: int = 100) -> list[str]:
+    paras = [p.strip() for p in re.split(r"\n{2,}", text) if p.strip()]
+    chunks, buf = [], ""
+    for p in paras:
+        if not buf:
+            buf = p
+        elif len(buf) + 2 + len(p) <= chunk_size:
+            buf += "\n\n" + p
+        else:
+            chunks.append(buf)
+            tail = buf[-overlap:]
+            buf = (tail + "\n\n" + p) if overlap > 0 else p
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+def report(name: str, text: str, fn, repeat: int, max_tokens: int) -> None:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = fn(text)
+        times.append(time.perf_counter() - t0)
+    toks = sorted(estimate_tokens(c) for c in chunks)
+    best = min(times)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    over = sum(t > max_tokens for t in toks)
+    print(f"{name:<10} {mb / best:>8.1f} {len(chunks):>8} {statistics.fmean(toks):>8.1f} "
+          f"{toks[int(len(toks) * 0.95)]:>7} {toks[-1]:>8} {over:>6} {sum(toks):>11}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mb", type=float, default=4.0, help="size of the synthetic text")
+    ap.add_argument("--file", help="chunk this file instead")
+    ap.add_argument("--max-tokens", type=int, default=200)
+    ap.add_argument("--overlap", type=int, default=25)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per strategy; the fastest counts")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    else:
+        text = synthetic_text(args.mb, args.seed)
+    print(f"{len(text.encode('utf-8')) / (1024 * 1024):.1f} MB, max_tokens={args.max_tokens}, overlap={args.overlap}")
+    print(f"{'strategy':<10} {'MB/s':>8} {'chunks':>8} {'avg tok':>8} {'p95 tok':>7} {'max tok':>8} "
+          f"{'>max':>6} {'total tok':>11}")
+    report("legacy", text, legacy_chunks, args.repeat, args.max_tokens)
+    for strategy in STRATEGIES:
+        report(strategy, text, lambda t, s=strategy: split_into_chunks(t, s, args.max_tokens, args.overlap),
+               args.repeat, args.max_tokens)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Latency / recall benchmark: in-process LocalIndex (app/services/local_index.py) vs pgvector.
+
+The corpus is the embeddings already in `chunk` (--source db, default), or a synthetic
+clustered set (--source synthetic, local variants only). Queries are stored vectors
+with noise added, so they have real near neighbours. Ground truth is an exact float32
+scan; recall@k is the share of true top-k neighbours each variant returns.
+
+    python -m scripts.bench_local_index --queries 200 --k 10
+    python -m scripts.bench_local_index --source synthetic --rows 200000 --dim 768
+
+pgvector timings are full round trips (the search SQL /rag/search runs, with the
+configured VECTOR_INDEX and probes/ef_search); local timings are the in-process
+top-k only, so add one primary-key lookup for what /rag/search pays on that path.
+float16 halves memory and disk but is widened block by block on every scan, so it
+trades latency for footprint. Needs numpy.
+"""
+import argparse, asyncio, statistics, time
+import numpy as np
+from app.services.local_index import LocalIndex
+
+def synthetic(rows: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, rows // 500), dim)).astype(np.float32)
+    x = centers[rng.integers(0, len(centers), rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return np.arange(1, rows + 1, dtype=np.int64), x
+
+async def from_db() -> tuple[np.ndarray, np.ndarray]:
+    from sqlmodel import select
+    from app.db.models import Chunk
+    from app.db.session import async_session
+    async with async_session() as s:
+        rows = (await s.exec(select(Chunk.id, Chunk.embedding).order_by(Chunk.id))).all()
+    return (np.array([r[0] for r in rows], dtype=np.int64),
+            np.array([np.asarray(r[1], dtype=np.float32) for r in rows]))
+
+def make_queries(x: np.ndarray, n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    q = x[rng.integers(0, len(x), n)]
+    return q + 0.3 * np.linalg.norm(q, axis=1, keepdims=True) / np.sqrt(x.shape[1]) * rng.standard_normal(q.shape)
+
+class Truth:
+    """Exact float32 scores. A returned id counts as a hit when it scores at least as well as the
+    true k-th neighbour, so duplicate vectors (the same text ingested twice) don't read as misses."""
+
+    def __init__(self, ids: np.ndarray, x: np.ndarray, queries: np.ndarray, k: int):
+        self.k = k
+        self.row = {int(c): i for i, c in enumerate(ids)}
+        self.xn = x / np.linalg.norm(x, axis=1, keepdims=True)
+        self.qn = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        self.kth = [np.partition(self.xn @ q, -k)[-k] for q in self.qn]
+
+    def recall(self, got: list[list[int]]) -> float:
+        hits = []
+        for q, kth, ids in zip(self.qn, self.kth, got):
+            rows = [self.row[c] for c in ids[:self.k] if c in self.row]
+            hits.append(int(np.sum(self.xn[rows] @ q >= kth - 1e-5)) / self.k if rows else 0.0)
+        return statistics.fmean(hits)
+
+def report(name: str, lat: list[float], got: list[list[int]], gt: Truth) -> None:
+    lat = sorted(lat)
+    print(f"{name:<28} {statistics.median(lat) * 1000:>8.2f} {lat[int(len(lat) * 0.95)] * 1000:>8.2f} "
+          f"{len(lat) / sum(lat):>9.0f} {gt.recall(got):>8.3f}")
+
+def bench_local(ix: LocalIndex, queries: np.ndarray, k: int, **kw) -> tuple[list[float], list[list[int]]]:
+    lat, got = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        res = ix.search(q, k, **kw)
+        lat.append(time.perf_counter() - t0)
+        got.append([c for c, _ in res])
+    return lat, got
+
+async def bench_pgvector(queries: np.ndarray, k: int) -> tuple[list[float], list[list[int]]]:
+    from app.db.session import async_session, apply_search_params
+    from app.services.retrieval import vector_search
+    lat, got = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        async with async_session() as s:
+            await apply_search_params(s, k)
+            rows = (await s.exec(vector_search(q.tolist(), k))).all()
+        lat.append(time.perf_counter() - t0)
+        got.append([r[0] for r in rows])
+    return lat, got
+
+async def amain(args) -> None:
+    if args.source == "db":
+        ids, x = await from_db()
+    else:
+        ids, x = synthetic(args.rows, args.dim, args.seed)
+    if not len(ids):
+        raise SystemExit("no chunks to benchmark; ingest some content or use --source synthetic")
+    k = min(args.k, len(ids))
+    queries = make_queries(x, args.queries, args.seed)
+    gt = Truth(ids, x, queries, k)
+    docs = np.zeros(len(ids), dtype=np.int64)
+    print(f"{len(ids)} vectors x {x.shape[1]}, {len(queries)} queries, k={k}")
+    print(f"{'variant':<28} {'p50 ms':>8} {'p95 ms':>8} {'q/s':>9} {'recall':>8}")
+
+    for dtype in ("float32", "float16"):
+        ix = LocalIndex(None, x.shape[1], dtype)
+        ix.add(ids.tolist(), docs.tolist(), x)
+        report(f"local exact {dtype}", *bench_local(ix, queries, k, exact=True), gt)
+        t0 = time.perf_counter()
+        ix.train(args.lists)
+        lists = ix.stats()["lists"]
+        print(f"  (k-means, {lists} lists: {time.perf_counter() - t0:.2f} s)")
+        for probes in args.probes:
+            report(f"local ivf {dtype} p={probes}", *bench_local(ix, queries, k, probes=probes), gt)
+
+    if args.source == "db":
+        from app.core.config import VECTOR_INDEX
+        report(f"pgvector ({VECTOR_INDEX})", *(await bench_pgvector(queries, k)), gt)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--source", choices=["db", "synthetic"], default="db")
+    ap.add_argument("--rows", type=int, default=100_000, help="synthetic corpus size")
+    ap.add_argument("--dim", type=int, default=768, help="synthetic vector size")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--lists", type=int, default=0, help="k-means lists (0 = sqrt(rows))")
+    ap.add_argument("--probes", type=int, nargs="*", default=[4, 16, 64])
+    ap.add_argument("--seed", type=int, default=7)
+    asyncio.run(amain(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
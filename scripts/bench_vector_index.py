@@ -0,0 +1,161 @@
+"""
+Recall / latency benchmark for the pgvector index behind /rag/search.
+
+Loads synthetic clustered 768-d vectors into `chunk` (under a throwaway
+document), builds the requested index for each --storage mode, then for each
+ef_search / probes value reports recall@k against exact search plus p50/p99
+query latency. Index size is printed per storage mode; halfvec and binary
+re-rank --oversample x k candidates by exact cosine distance, as /rag/search
+does, and need pgvector >= 0.7.
+
+    python -m scripts.bench_vector_index --rows 50000 --index hnsw --ef-search 20 40 100
+    python -m scripts.bench_vector_index --rows 50000 --index ivfflat --probes 1 10 40
+    python -m scripts.bench_vector_index --rows 50000 --storage full halfvec binary --oversample 4
+
+The synthetic rows are deleted and the configured index restored afterwards
+unless --keep is given.
+"""
+import argparse, random, statistics, time
+from sqlalchemy import text
+from app.db import session
+from app.db.session import engine, init_db, ensure_vector_index, VECTOR_INDEX_NAME, STORAGE_INDEX
+
+DIM = 768
+BENCH_TITLE = "__bench_vector_index__"
+
+def _vec_literal(v: list[float]) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in v) + "]"
+
+def load_rows(conn, rows: int, clusters: int, noise: float, seed: int) -> int:
+    rnd = random.Random(seed)
+    doc_id = conn.execute(
+        text("INSERT INTO document (title, created_at) VALUES (:t, now()) RETURNING id"), {"t": BENCH_TITLE}
+    ).scalar_one()
+    conn.execute(text("CREATE TEMP TABLE bench_centers (id int PRIMARY KEY, v float8[]) ON COMMIT DROP"))
+    conn.execute(
+        text("INSERT INTO bench_centers VALUES (:id, :v)"),
+        [{"id": i, "v": [rnd.uniform(-1, 1) for _ in range(DIM)]} for i in range(clusters)],
+    )
+    # vectors are generated server-side: center + uniform noise per dimension
+    conn.execute(text("SELECT setseed(:s)"), {"s": (seed % 1000) / 1000})
+    conn.execute(text(f"""
+        INSERT INTO chunk (document_id, order_index, text, embedding)
+        SELECT :doc, g, 'bench ' || g,
+               (SELECT array_agg(c.v[i] + (random() - 0.5) * :noise ORDER BY i)
+                FROM generate_series(1, {DIM}) i)::vector
+        FROM generate_series(1, :n) g
+        JOIN bench_centers c ON c.id = g % :clusters
+    """), {"doc": doc_id, "n": rows, "clusters": clusters, "noise": noise})
+    return doc_id
+
+def make_queries(conn, n: int, noise: float, seed: int) -> list[str]:
+    rnd = random.Random(seed + 1)
+    centers = [list(v) for v in conn.execute(text("SELECT v FROM bench_centers ORDER BY id")).scalars()]
+    return [_vec_literal([x + rnd.uniform(-0.5, 0.5) * noise for x in rnd.choice(centers)]) for _ in range(n)]
+
+SEARCH = text("SELECT id FROM chunk ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k")
+# quantized index scan for :c candidates, exact re-rank to :k (same shape as retrieval._nearest)
+QUANTIZED_ORDER = {
+    "halfvec": f"embedding::halfvec({DIM}) <=> CAST(:q AS halfvec({DIM}))",
+    "binary": f"binary_quantize(embedding)::bit({DIM}) <~> binary_quantize(CAST(:q AS vector({DIM})))",
+}
+
+def search_sql(storage: str):
+    if storage == "full":
+        return SEARCH
+    return text(f"""
+        SELECT id FROM (SELECT id, embedding FROM chunk ORDER BY {QUANTIZED_ORDER[storage]} LIMIT :c) cand
+        ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k
+    """)
+
+def index_size(conn) -> tuple[int, int]:
+    """(index bytes, bytes per stored embedding in the heap)"""
+    idx = conn.execute(text("SELECT pg_relation_size(CAST(:n AS regclass))"), {"n": VECTOR_INDEX_NAME}).scalar()
+    heap = conn.execute(text("SELECT avg(pg_column_size(embedding))::int FROM chunk")).scalar()
+    return idx or 0, heap or 0
+
+def exact_topk(conn, queries: list[str], k: int) -> list[set[int]]:
+    out = []
+    for q in queries:
+        conn.execute(text("SET LOCAL enable_indexscan = off"))
+        out.append(set(conn.execute(SEARCH, {"q": q, "k": k}).scalars()))
+    return out
+
+def run(conn, queries: list[str], truth: list[set[int]], k: int, guc: str | None, value: int | None,
+        storage: str = "full", candidates: int = 0):
+    lat, hits = [], 0
+    sql = search_sql(storage)
+    conn.execute(text("SET LOCAL enable_indexscan = on"))
+    if guc:
+        if guc == "hnsw.ef_search":
+            value = max(value, candidates)   # as apply_search_params does
+        conn.execute(text("SELECT set_config(:g, :v, true)"), {"g": guc, "v": str(value)})
+    for q, exp in zip(queries, truth):
+        t0 = time.perf_counter()
+        got = conn.execute(sql, {"q": q, "k": k, "c": candidates}).scalars().all()
+        lat.append((time.perf_counter() - t0) * 1000)
+        hits += len(exp.intersection(got))
+    lat.sort()
+    return {
+        "recall": hits / (k * len(queries)),
+        "p50_ms": statistics.median(lat),
+        "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--clusters", type=int, default=100)
+    ap.add_argument("--noise", type=float, default=2.0)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--index", choices=["hnsw", "ivfflat"], default="hnsw")
+    ap.add_argument("--m", type=int, default=16)
+    ap.add_argument("--ef-construction", type=int, default=64)
+    ap.add_argument("--lists", type=int, default=0, help="0 = size from row count")
+    ap.add_argument("--ef-search", type=int, nargs="*", default=[10, 20, 40, 80, 200])
+    ap.add_argument("--probes", type=int, nargs="*", default=[1, 5, 10, 20, 50])
+    ap.add_argument("--storage", nargs="*", choices=list(STORAGE_INDEX), default=["full"])
+    ap.add_argument("--oversample", type=int, default=4, help="candidates per result for halfvec/binary")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--keep", action="store_true", help="keep synthetic rows and the benchmark index")
+    args = ap.parse_args()
+
+    init_db()
+    with engine.connect() as conn:
+        t0 = time.perf_counter()
+        doc_id = load_rows(conn, args.rows, args.clusters, args.noise, args.seed)
+        queries = make_queries(conn, args.queries, args.noise, args.seed)
+        conn.commit()
+        print(f"loaded {args.rows} rows in {time.perf_counter() - t0:.1f}s")
+
+        truth = exact_topk(conn, queries, args.k)
+        conn.commit()
+
+        guc, values = ("hnsw.ef_search", args.ef_search) if args.index == "hnsw" else ("ivfflat.probes", args.probes)
+        for storage in args.storage:
+            if storage != "full" and session.pgvector_version < (0, 7):
+                print(f"\n{storage}: skipped, needs pgvector >= 0.7")
+                continue
+            t0 = time.perf_counter()
+            built = ensure_vector_index(conn, args.index, m=args.m, ef_construction=args.ef_construction,
+                                        lists=args.lists, storage=storage)
+            conn.commit()
+            idx_bytes, heap_bytes = index_size(conn)
+            print(f"\n{storage}: index {built} in {time.perf_counter() - t0:.1f}s, "
+                  f"{idx_bytes / 2**20:.1f} MB ({idx_bytes / args.rows:.0f} B/row; heap vector {heap_bytes} B/row)")
+            candidates = args.k if storage == "full" else args.k * args.oversample
+            print(f"{guc:>16} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+            for v in values:
+                r = run(conn, queries, truth, args.k, guc, v, storage, candidates)
+                conn.commit()
+                print(f"{v:>16} {r['recall']:>10.3f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+        if not args.keep:
+            conn.execute(text("DELETE FROM chunk WHERE document_id = :d"), {"d": doc_id})
+            conn.execute(text("DELETE FROM document WHERE id = :d"), {"d": doc_id})
+            print(f"restored index: {ensure_vector_index(conn)}")
+            conn.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test for a running API (pair it with scripts/ollama_emulator.py).
+
+Drives /plan/generate, /content/ingest, /rag/search, /tasks/{id}/complete and
+/plans/{id}/progress at a fixed concurrency and reports throughput and
+p50/p95/p99 latency per scenario.
+
+    python -m scripts.ollama_emulator --port 11435 &
+    OLLAMA_HOST=http://127.0.0.1:11435 uvicorn app.main:app --port 8000 &
+    python -m scripts.loadtest --base-url http://127.0.0.1:8000 --requests 200 --concurrency 16
+
+--out writes the results as JSON; --baseline compares against such a file and
+exits 1 if any scenario's p95 regressed by more than --tolerance (CI gate).
+"""
+import argparse, asyncio, json, random, statistics, sys, time
+import httpx
+
+SCENARIOS = ["plan", "ingest", "search", "complete", "progress"]
+
+WORDS = ("vector index query plan task learn study embed chunk search token model "
+         "practice review lesson project graph table schema cache latency").split()
+
+def _text(r: random.Random, n: int) -> str:
+    return " ".join(r.choice(WORDS) for _ in range(n))
+
+async def setup(c: httpx.AsyncClient, r: random.Random) -> dict:
+    """A plan with plenty of tasks and a few documents, so every scenario has something to hit."""
+    plan = (await c.post("/plans", json={
+        "name": "loadtest", "goal": "load test", "level": "beginner", "minutes": 30, "deadline": "in 4 weeks",
+        "milestones": ["m1", "m2", "m3"],
+        "tasks": [{"title": f"task {i}", "type": "practice", "est_minutes": 20, "due_date": "2030-01-01"}
+                  for i in range(200)],
+    })).raise_for_status().json()
+    for i in range(5):
+        (await c.post("/content/ingest", json={"title": f"loadtest doc {i}", "text": _text(r, 2000),
+                                               "tags": "loadtest"})).raise_for_status()
+    return {"plan_id": plan["id"], "task_ids": [t["id"] for t in plan["tasks"]]}
+
+def make_request(name: str, ctx: dict, r: random.Random, i: int):
+    if name == "plan":
+        # a handful of distinct goals, so coalescing/caching show up the way they would in real traffic
+        return "POST", "/plan/generate", {"goal": f"learn topic {i % 20}", "minutes": 30}
+    if name == "ingest":
+        return "POST", "/content/ingest", {"title": f"lt {i}", "text": _text(r, 600), "tags": "loadtest"}
+    if name == "search":
+        return "POST", "/rag/search", {"query": _text(r, 4), "top_k": 5}
+    if name == "complete":
+        body = {"outcome": r.choice(["done", "partial"])}
+        if r.random() < 0.3:
+            body["reflection"] = {"confidence": r.randint(1, 5)}
+        return "POST", f"/tasks/{r.choice(ctx['task_ids'])}/complete", body
+    if name == "progress":
+        return "GET", f"/plans/{ctx['plan_id']}/progress", None
+    raise ValueError(name)
+
+def _pct(sorted_ms: list[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(p / 100 * (len(sorted_ms) - 1))))]
+
+async def run_scenario(c: httpx.AsyncClient, name: str, ctx: dict, n: int, concurrency: int, seed: int) -> dict:
+    r = random.Random(seed)
+    reqs = [make_request(name, ctx, r, i) for i in range(n)]
+    lat: list[float] = []
+    errors = 0
+    it = iter(reqs)
+
+    async def worker():
+        nonlocal errors
+        for method, url, body in it:
+            t0 = time.perf_counter()
+            try:
+                resp = await c.request(method, url, json=body)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            lat.append((time.perf_counter() - t0) * 1000)
+            errors += not ok
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": n / wall if wall else 0.0,
+        "p50_ms": _pct(lat, 50),
+        "p95_ms": _pct(lat, 95),
+        "p99_ms": _pct(lat, 99),
+        "mean_ms": statistics.fmean(lat) if lat else 0.0,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    bad = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base and base["p95_ms"] > 0 and res["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            bad.append(f"{name}: p95 {res['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+        if base is not None and res["errors"] > base.get("errors", 0):
+            bad.append(f"{name}: {res['errors']} errors vs baseline {base.get('errors', 0)}")
+    return bad
+
+async def amain(args) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as c:
+        ctx = await setup(c, random.Random(args.seed))
+        results = {}
+        print(f"{'scenario':<10} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for i, name in enumerate(args.scenarios):
+            res = results[name] = await run_scenario(c, name, ctx, args.requests, args.concurrency, args.seed + i)
+            print(f"{name:<10} {res['requests']:>6} {res['errors']:>5} {res['rps']:>8.1f} "
+                  f"{res['p50_ms']:>8.1f} {res['p95_ms']:>8.1f} {res['p99_ms']:>8.1f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            bad = compare(results, json.load(f), args.tolerance)
+        for line in bad:
+            print(f"REGRESSION {line}")
+        return 1 if bad else 0
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--scenarios", nargs="*", choices=SCENARIOS, default=SCENARIOS)
+    ap.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth over baseline (0.25 = +25%%)")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(amain(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Stand-in for Ollama so the API can be exercised and benchmarked without a GPU.
+
+Implements /api/generate (JSON and streaming), /api/embed, /api/embeddings and
+/api/tags. Outputs are deterministic: the same prompt always yields the same
+plan / coach decision / text, and the same text always yields the same unit
+vector. Latency is simulated per call plus per generated token / embedded text.
+
+    python -m scripts.ollama_emulator --port 11435 --latency-ms 50 --tokens-per-sec 200
+    OLLAMA_HOST=http://127.0.0.1:11435 uvicorn app.main:app
+
+Generated plans and coach tips carry no resource links, so link checks never
+leave the machine.
+"""
+import argparse, asyncio, hashlib, json, math, random, time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Ollama emulator")
+cfg = argparse.Namespace(latency_ms=50.0, jitter_ms=0.0, tokens_per_sec=0.0, embed_ms_per_text=1.0, dim=768, seed=0)
+
+TASK_TYPES = ["lesson", "video", "reading", "practice", "project", "quiz"]
+
+def _rng(*parts) -> random.Random:
+    h = hashlib.sha256("\x1f".join(str(p) for p in (cfg.seed, *parts)).encode("utf-8")).hexdigest()
+    return random.Random(int(h[:16], 16))
+
+async def _sleep_base(key: str) -> None:
+    jitter = _rng("jitter", key, time.monotonic_ns()).uniform(-cfg.jitter_ms, cfg.jitter_ms) if cfg.jitter_ms else 0.0
+    await asyncio.sleep(max(0.0, cfg.latency_ms + jitter) / 1000)
+
+def _plan(prompt: str) -> dict:
+    r = _rng("plan", prompt)
+    n_tasks = r.randint(6, 12)
+    return {
+        "milestones": [f"Milestone {i}: {w}" for i, w in enumerate(r.sample(
+            ["foundations", "core concepts", "guided practice", "projects", "review", "assessment"], 3), start=1)],
+        "tasks": [
+            {
+                "title": f"Step {i}: {r.choice(['read', 'watch', 'practice', 'build', 'review'])} topic {r.randint(1, 99)}",
+                "type": r.choice(TASK_TYPES),
+                "est_minutes": r.choice([15, 20, 30, 45, 60]),
+                "due_in_days": min(i * 2, 27),
+            }
+            for i in range(n_tasks)
+        ],
+    }
+
+def _coach(prompt: str) -> dict:
+    r = _rng("coach", prompt)
+    actions = [{"type": "tip", "tip": r.choice(["Take a short break between sessions.",
+                                                "Summarize what you learned in three bullets.",
+                                                "Redo the hardest exercise tomorrow."])}]
+    if r.random() < 0.5:
+        actions.append({"type": "add_task", "title": "Extra practice on the last topic",
+                        "est_minutes": 20, "due_in_days": 1})
+    return {"actions": actions}
+
+def _response_text(prompt: str, json_format: bool) -> str:
+    if "curriculum planner" in prompt:
+        return json.dumps(_plan(prompt))
+    if "learning coach" in prompt:
+        return json.dumps(_coach(prompt))
+    if json_format:
+        return json.dumps({"answer": f"emulated {hashlib.md5(prompt.encode()).hexdigest()[:8]}"})
+    r = _rng("text", prompt)
+    return " ".join(r.choice(["lorem", "ipsum", "dolor", "sit", "amet", "study", "plan"]) for _ in range(40))
+
+def _tokens(s: str) -> list[str]:
+    # ~4 characters per token, like real tokenizers on English text
+    return [s[i:i + 4] for i in range(0, len(s), 4)] or [""]
+
+def _vector(text: str) -> list[float]:
+    r = _rng("embed", text)
+    v = [r.gauss(0.0, 1.0) for _ in range(cfg.dim)]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+def _counts(prompt: str, toks: list[str], started: float) -> dict:
+    return {
+        "prompt_eval_count": max(1, len(prompt) // 4),
+        "eval_count": len(toks),
+        "total_duration": int((time.perf_counter() - started) * 1e9),
+    }
+
+@app.post("/api/generate")
+async def generate(req: Request):
+    body = await req.json()
+    model, prompt = body.get("model", ""), body.get("prompt", "")
+    started = time.perf_counter()
+    text = _response_text(prompt, body.get("format") == "json")
+    toks = _tokens(text)
+    await _sleep_base(prompt)
+
+    if body.get("stream", True):
+        async def lines():
+            per_token = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+            for t in toks:
+                if per_token:
+                    await asyncio.sleep(per_token)
+                yield json.dumps({"model": model, "response": t, "done": False}) + "\n"
+            yield json.dumps({"model": model, "response": "", "done": True, **_counts(prompt, toks, started)}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    if cfg.tokens_per_sec > 0:
+        await asyncio.sleep(len(toks) / cfg.tokens_per_sec)
+    return JSONResponse({"model": model, "response": text, "done": True, **_counts(prompt, toks, started)})
+
+@app.post("/api/embed")
+async def embed(req: Request):
+    body = await req.json()
+    inputs = body.get("input")
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+    await _sleep_base("embed")
+    await asyncio.sleep(cfg.embed_ms_per_text * len(inputs) / 1000)
+    return {
+        "model": body.get("model", ""),
+        "embeddings": [_vector(t) for t in inputs],
+        "prompt_eval_count": sum(max(1, len(t) // 4) for t in inputs),
+    }
+
+@app.post("/api/embeddings")
+async def embeddings(req: Request):
+    body = await req.json()
+    text = body.get("prompt") or body.get("input") or ""
+    await _sleep_base("embed")
+    await asyncio.sleep(cfg.embed_ms_per_text / 1000)
+    return {"embedding": _vector(text)}
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": [{"name": "llama3.2:latest"}, {"name": "nomic-embed-text:latest"}]}
+
+def main():
+    import uvicorn
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="fixed delay per request")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on that delay")
+    ap.add_argument("--tokens-per-sec", type=float, default=0.0, help="generation speed; 0 = instant")
+    ap.add_argument("--embed-ms-per-text", type=float, default=1.0)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for k in ("latency_ms", "jitter_ms", "tokens_per_sec", "embed_ms_per_text", "dim", "seed"):
+        setattr(cfg, k, getattr(args, k))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import asyncio, time
+import httpx
+from app.services import http_clients
+from app.utils import url_check
+
+def test_hot_host_does_not_starve_other_hosts(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200)
+
+    async def run():
+        monkeypatch.setattr(url_check, "_global_sem", asyncio.Semaphore(4))
+        monkeypatch.setattr(url_check, "PER_HOST_CONCURRENCY", 1)
+        monkeypatch.setattr(http_clients, "_web", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+        async def timed(url):
+            t0 = time.perf_counter()
+            ok = await url_check.is_valid_url(url)
+            return ok, time.perf_counter() - t0
+
+        hot = [asyncio.create_task(timed(f"https://hot.example.com/{i}")) for i in range(20)]
+        await asyncio.sleep(0.01)   # the hot burst is queued first
+        cold_ok, cold_t = await timed("https://cold.example.org/page")
+        for t in hot:
+            t.cancel()
+        await asyncio.gather(*hot, return_exceptions=True)
+        await http_clients._web.aclose()
+        return cold_ok, cold_t
+
+    cold_ok, cold_t = asyncio.run(run())
+    assert cold_ok
+    # one probe (0.2s) plus slack; waiting behind the hot host's queue would take 0.4s or more
+    assert cold_t < 0.35